@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Content-hash asset fingerprinting
+Writes copies of stylesheets and images with their content hash in the file name, so they
+can be served with long-lived immutable cache headers, rewrites references to them and
+records an original -> fingerprinted manifest for the deploy step
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+from build_manifest import hash_file
+from output_files import copy_file, write_if_changed
+from template_deps import resolve_css_paths
+
+DEFAULT_HASH_LENGTH = 10
+MANIFEST_NAME = 'manifest.json'
+
+SRC_ATTRIBUTE_PATTERN = re.compile(r'(\ssrc=")([^"]+)(")', re.IGNORECASE)
+
+
+def fingerprinted_name(path, digest, length=DEFAULT_HASH_LENGTH):
+    """styles.css -> styles.<hash>.css"""
+    path = Path(path)
+    return f"{path.stem}.{digest[:length]}{path.suffix}"
+
+
+def is_fingerprinted_name(name, length=DEFAULT_HASH_LENGTH):
+    """True for names fingerprinted_name() produces: <stem>.<hash>[.<ext>]"""
+    return re.fullmatch(rf'.+\.[0-9a-f]{{{length}}}(\.[^.]+)?', name) is not None
+
+
+def _relative_url(target, from_dir):
+    return Path(os.path.relpath(target, from_dir)).as_posix()
+
+
+class AssetFingerprinter:
+    """Creates fingerprinted copies under output_dir, mirroring the source layout"""
+
+    def __init__(self, output_dir, manifest_file, hash_length=DEFAULT_HASH_LENGTH):
+        self.output_dir = Path(output_dir)
+        self.manifest_file = Path(manifest_file)
+        self.hash_length = hash_length
+        self.entries = {}
+        self.new_entries = {}
+        self._hashes = {}
+
+    def fingerprint(self, path):
+        """Return the fingerprinted copy of a file (creating it if needed), or None if it does not exist"""
+        source = Path(os.path.normpath(path))
+        try:
+            stat = source.stat()
+        except OSError:
+            return None
+
+        key = source.as_posix()
+        cached = self._hashes.get(key)
+        if not cached or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            digest = hash_file(source)
+            # Mirror the source directories (minus any leading ../) so equal names cannot collide
+            parts = [part for part in source.parent.parts if part not in ('..', '.')]
+            target = self.output_dir.joinpath(*parts, fingerprinted_name(source, digest, self.hash_length))
+            copy_file(source, target)
+            cached = (stat.st_mtime_ns, stat.st_size, target)
+            self._hashes[key] = cached
+
+        target = cached[2]
+        if self.entries.get(key) != target.as_posix():
+            self.entries[key] = target.as_posix()
+            self.new_entries[key] = target.as_posix()
+        return target
+
+    def rewrite_css_files(self, css_files, output_file):
+        """css_files (relative to output_file) pointing at the fingerprinted stylesheets"""
+        rewritten = []
+        for css_file, css_path in zip(css_files, resolve_css_paths(css_files, output_file)):
+            target = self.fingerprint(css_path)
+            rewritten.append(_relative_url(target, Path(output_file).parent) if target else css_file)
+        return rewritten
+
+    def rewrite_srcs(self, html, resolve, output_file):
+        """Point src attributes that resolve to local files at their fingerprinted copies"""
+        if ' src=' not in html:
+            return html
+
+        def replace(match):
+            path = resolve(match.group(2))
+            target = self.fingerprint(path) if path else None
+            if not target:
+                return match.group(0)
+            return f'{match.group(1)}{_relative_url(target, Path(output_file).parent)}{match.group(3)}'
+
+        return SRC_ATTRIBUTE_PATTERN.sub(replace, html)
+
+    def take_new_entries(self):
+        """Entries added since the last call (worker processes hand these to the parent)"""
+        entries, self.new_entries = self.new_entries, {}
+        return entries
+
+    def update(self, entries):
+        self.entries.update(entries)
+
+    def save_manifest(self, referenced=None):
+        """Write the original -> fingerprinted manifest, keeping entries from earlier builds
+        (pages skipped by an incremental build) whose source still exists, then delete the
+        fingerprinted copies it no longer lists. With `referenced` (the files the site's pages
+        depend on) entries for files no page uses any more are dropped as well."""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        manifest = {original: hashed for original, hashed in previous.items()
+                    if Path(original).exists() and Path(hashed).exists()}
+        manifest.update(self.entries)
+        if referenced is not None:
+            manifest = {original: hashed for original, hashed in manifest.items() if original in referenced}
+        write_if_changed(self.manifest_file, json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+        self.prune(set(previous.values()) | set(self.entries.values()), manifest)
+        return manifest
+
+    def prune(self, recorded, manifest):
+        """Delete the fingerprinted copies in `recorded` (paths a manifest listed) that `manifest`
+        no longer lists
+
+        Only files below output_dir with a fingerprinted name are touched, so pointing
+        output_dir at a directory that holds other output never deletes that output.
+        """
+        keep = {Path(hashed) for hashed in manifest.values()}
+        output_dir = self.output_dir.resolve()
+        removed = 0
+        for hashed in sorted(recorded):
+            path = Path(hashed)
+            if path in keep or not is_fingerprinted_name(path.name, self.hash_length) \
+                    or output_dir not in path.resolve().parents:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            # Remove directories emptied by pruning, up to output_dir
+            parent = path.parent
+            while parent.resolve() != output_dir and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return removed
+
+
+def open_asset_fingerprinter(config):
+    """Create the fingerprinter described by the `assets` config section, or None when disabled"""
+    settings = config.get('assets') or {}
+    if not settings.get('fingerprint', False):
+        return None
+    output_dir = settings.get('output_dir') or f"{config['output']['root_dir']}/assets"
+    manifest_file = settings.get('manifest_file') or f"{output_dir}/{MANIFEST_NAME}"
+    return AssetFingerprinter(output_dir, manifest_file, int(settings.get('hash_length', DEFAULT_HASH_LENGTH)))
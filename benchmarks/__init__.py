@@ -0,0 +1 @@
+"""Benchmarks for the converters (run the scripts directly, or `python -m benchmarks.suite`)"""
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark frontmatter and config parsing: pure-Python SafeLoader vs the shared yaml_loader layer
+Reports frontmatter parse time per 1,000 files and config load time cold vs memoized
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import yaml_loader  # noqa: E402
+from frontmatter import read_frontmatter_text  # noqa: E402
+
+
+def load_frontmatters(docs_dir):
+    """Raw frontmatter text of every file under docs/ that has one"""
+    texts = []
+    for md_file in sorted(Path(docs_dir).rglob('*.md')):
+        text = read_frontmatter_text(md_file)
+        if text is not None:
+            texts.append(text.strip())
+    return texts
+
+
+def time_per_thousand(load, texts, files, repeat):
+    """Best-of-N seconds to parse `files` frontmatters, scaled to 1,000 files"""
+    batch = [texts[i % len(texts)] for i in range(files)]
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in batch:
+            try:
+                load(text)
+            except yaml.YAMLError:
+                pass
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / files
+
+
+def time_call(func, repeat):
+    """Best-of-N seconds for a single call"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark YAML frontmatter and config parsing')
+    parser.add_argument('--docs', default=str(REPO_ROOT / 'docs'), help='Corpus directory')
+    parser.add_argument('--files', type=int, default=1000, help='Frontmatters parsed per run')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+    parser.add_argument('--config', default=str(REPO_ROOT / 'convert_config_generic.yml'),
+                        help='Config file for the config load benchmark')
+    args = parser.parse_args()
+
+    texts = load_frontmatters(args.docs)
+    if not texts:
+        print(f"No frontmatter found under {args.docs}")
+        return 1
+
+    print(f"Loader: {yaml_loader.SafeLoader.__name__} (libyaml {'available' if yaml_loader.using_libyaml() else 'not available'})")
+    print(f"Corpus: {len(texts)} frontmatter blocks, {args.files} parsed per run")
+    print()
+
+    pure = time_per_thousand(lambda text: yaml.load(text, Loader=yaml.SafeLoader), texts, args.files, args.repeat)
+    shared = time_per_thousand(yaml_loader.safe_load, texts, args.files, args.repeat)
+    print(f"{'Frontmatter':<24}  {'per 1,000 files':>15}")
+    print(f"{'yaml.SafeLoader':<24}  {pure * 1000:>12.1f} ms")
+    print(f"{'yaml_loader.safe_load':<24}  {shared * 1000:>12.1f} ms  ({pure / shared:.1f}x)")
+    print()
+
+    cache_dir = tempfile.mkdtemp(prefix='bench-config-')
+    try:
+        config_text = Path(args.config).read_text(encoding='utf-8')
+        uncached = time_call(lambda: yaml.load(config_text, Loader=yaml.SafeLoader), args.repeat)
+
+        def cold():
+            yaml_loader._config_memo.clear()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            yaml_loader.load_yaml_config(args.config, cache_dir)
+
+        def from_disk():
+            yaml_loader._config_memo.clear()
+            yaml_loader.load_yaml_config(args.config, cache_dir)
+
+        cold_time = time_call(cold, args.repeat)
+        from_disk()
+        disk_time = time_call(from_disk, args.repeat)
+        memo_time = time_call(lambda: yaml_loader.load_yaml_config(args.config, cache_dir), args.repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"{'Config load':<24}  {'time':>15}")
+    print(f"{'yaml.SafeLoader':<24}  {uncached * 1e6:>12.0f} us")
+    print(f"{'cold (parse + store)':<24}  {cold_time * 1e6:>12.0f} us")
+    print(f"{'new process (pickle)':<24}  {disk_time * 1e6:>12.0f} us")
+    print(f"{'same process (memo)':<24}  {memo_time * 1e6:>12.0f} us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the tokenizer-based markdown_to_html against the original re.sub cascade
+Verifies identical output on the docs/ corpus, then reports throughput in MB/s on large documents
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.corpus import load_corpus  # noqa: E402
+from markdown_engines import markdown_to_html, markdown_to_html_regex  # noqa: E402
+
+
+def check_conformance(bodies):
+    """Return the files whose output differs between the two implementations"""
+    return [md_file for md_file, body in bodies
+            if markdown_to_html(body, {}) != markdown_to_html_regex(body, {})]
+
+
+def measure(func, text, repeat):
+    """Best-of-N throughput in MB/s"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text, {})
+        best = min(best, time.perf_counter() - start)
+    return len(text.encode('utf-8')) / 1e6 / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark markdown_to_html implementations')
+    parser.add_argument('--docs', default=str(REPO_ROOT / 'docs'), help='Corpus directory')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[0.1, 1.0, 8.0],
+                        help='Document sizes to benchmark, in MB')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+    args = parser.parse_args()
+
+    bodies = load_corpus(args.docs)
+    mismatches = check_conformance(bodies)
+    print(f"Conformance: {len(bodies) - len(mismatches)} of {len(bodies)} corpus files identical")
+    for md_file in mismatches:
+        print(f"  MISMATCH: {md_file}")
+
+    corpus = '\n\n'.join(body for _, body in bodies)
+    print()
+    print(f"{'Size':>8}  {'re.sub cascade':>15}  {'tokenizer':>10}  {'speedup':>8}")
+
+    for size_mb in args.sizes:
+        copies = max(1, int(size_mb * 1e6 / max(1, len(corpus))))
+        text = '\n\n'.join([corpus] * copies)
+        if markdown_to_html(text, {}) != markdown_to_html_regex(text, {}):
+            print(f"  MISMATCH on the {size_mb} MB document")
+        regex_rate = measure(markdown_to_html_regex, text, args.repeat)
+        token_rate = measure(markdown_to_html, text, args.repeat)
+        print(f"{len(text) / 1e6:>6.2f}MB  {regex_rate:>10.1f} MB/s  {token_rate:>5.1f} MB/s  "
+              f"{token_rate / regex_rate:>7.2f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Conformance and speed harness for the markdown engines
+Renders every markdown file under docs/ with each engine, diffs the result against the
+reference (regex cascade) output and reports per-engine throughput
+"""
+
+import argparse
+import difflib
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.corpus import load_corpus  # noqa: E402
+from markdown_engines import available_engines, get_markdown_engine  # noqa: E402
+
+REFERENCE_ENGINE = 'regex'
+
+
+def normalize(html, ignore_whitespace):
+    """Split output into lines for diffing, optionally ignoring whitespace-only differences"""
+    lines = html.split('\n')
+    if ignore_whitespace:
+        lines = [line.strip() for line in lines if line.strip()]
+    return lines
+
+
+def run_engine(render, bodies, repeat):
+    """Render the corpus, returning the outputs of the first run and the best time"""
+    outputs = None
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [render(body, {}, 2) for _, body in bodies]
+        best = min(best, time.perf_counter() - start)
+        outputs = outputs or results
+    return outputs, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare markdown engines against the reference output')
+    parser.add_argument('--docs', default=str(REPO_ROOT / 'docs'), help='Corpus directory')
+    parser.add_argument('--engines', nargs='+', help='Engines to compare (default: all available)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per engine (best is kept)')
+    parser.add_argument('--ignore-whitespace', action='store_true',
+                        help='Ignore leading/trailing whitespace and blank lines when diffing')
+    parser.add_argument('--show-diff', action='store_true', help='Print unified diffs for differing files')
+    args = parser.parse_args()
+
+    bodies = load_corpus(args.docs)
+    corpus_mb = sum(len(body.encode('utf-8')) for _, body in bodies) / 1e6
+    reference, _ = run_engine(get_markdown_engine(REFERENCE_ENGINE), bodies, 1)
+
+    print(f"Corpus: {len(bodies)} files, {corpus_mb:.2f} MB (reference engine: {REFERENCE_ENGINE})")
+    print()
+    print(f"{'Engine':<14} {'Identical':>10} {'Changed lines':>14} {'Throughput':>12}")
+
+    for name in args.engines or available_engines():
+        try:
+            render = get_markdown_engine(name)
+        except (ImportError, ValueError) as e:
+            print(f"{name:<14} unavailable: {e}")
+            continue
+
+        outputs, elapsed = run_engine(render, bodies, args.repeat)
+        identical = 0
+        changed_lines = 0
+        diffs = []
+        for (md_file, _), expected, actual in zip(bodies, reference, outputs):
+            expected_lines = normalize(expected, args.ignore_whitespace)
+            actual_lines = normalize(actual, args.ignore_whitespace)
+            if expected_lines == actual_lines:
+                identical += 1
+                continue
+            diff = list(difflib.unified_diff(expected_lines, actual_lines, f'{md_file} ({REFERENCE_ENGINE})',
+                                             f'{md_file} ({name})', lineterm=''))
+            changed_lines += sum(1 for line in diff[2:] if line[:1] in '+-')
+            diffs.append(diff)
+
+        print(f"{name:<14} {identical:>4}/{len(bodies):<5} {changed_lines:>14} {corpus_mb / elapsed:>7.1f} MB/s")
+        if args.show_diff:
+            for diff in diffs:
+                print('\n'.join(diff))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Synthetic corpus generator
+Writes a site shaped like the real one: docs/index.md (collection cards), articles and
+software lists in docs/posts/, portfolio pages with galleries in docs/portfolio/, plus
+copies of the templates, CSS and config, so the converters can run on it unchanged.
+Generation is seeded, so the same settings always give the same corpus.
+"""
+
+import argparse
+import random
+import shutil
+import struct
+import zlib
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_SPEC = {
+    'articles': 40,          # docs/posts/*.md with frontmatter and markdown bodies
+    'software_lists': 4,     # docs/posts/*.md with | Software | ... | tables
+    'portfolio': 20,         # docs/portfolio/*.md with galleries
+    'body_kb': 8,            # Approximate body size of an article
+    'table_rows': 12,        # Rows per table (software list eras, article tables)
+    'image_density': 0.15,   # Share of article sections followed by an image
+    'seed': 1,
+}
+
+# Site files the converters read besides docs/
+SITE_FILES = ['convert_config_generic.yml', 'convert_config.yml', 'CNAME']
+SITE_DIRS = ['templates', 'css']
+
+WORDS = '''
+software durable release maintained community editor archive version years stable
+plugin format portable license developer project history feature update platform
+open source lightweight toolkit compiler terminal network backup library interface
+'''.split()
+
+ERAS = ['30+ Years (Legends)', '25-29 Years (Veterans)', '20-24 Years (Established)',
+        '15-19 Years (Mature)', '10-14 Years (Proven)', '5-9 Years (Rising Stars)']
+CATEGORIES = ['Text Editor', 'File Manager', 'Archiver', 'Media Player', 'Image Viewer', 'SSH / Terminal']
+STATUSES = ['Live', 'In Progress', 'Upcoming']
+MONTHS = ['January', 'March', 'May', 'July', 'September', 'November']
+
+
+def sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rng, sentences=4):
+    """A paragraph with the inline markup the converters handle"""
+    parts = [sentence(rng, rng.randint(8, 16)) for _ in range(sentences)]
+    word = rng.choice(WORDS)
+    parts[0] = parts[0].replace(word, f'**{word}**', 1)
+    parts[-1] = parts[-1].replace(rng.choice(WORDS), f'*{rng.choice(WORDS)}*', 1)
+    parts.append(f'See `{rng.choice(WORDS)}()` and [the {rng.choice(WORDS)} notes](../index.html).')
+    return ' '.join(parts)
+
+
+def software_table(rng, rows):
+    lines = ['| Software | First Released | Years Active | Category | Notes |',
+             '|----------|----------------|--------------|----------|-------|']
+    for _ in range(rows):
+        released = rng.randint(1985, 2020)
+        lines.append(f'| **{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}** | {released} | '
+                     f'{2025 - released} years | {rng.choice(CATEGORIES)} | {sentence(rng, 8)} |')
+    return '\n'.join(lines)
+
+
+def data_table(rng, rows):
+    """A plain table (the | Software | header would make the page a software list)"""
+    lines = ['| Name | Version | Notes |', '|------|---------|-------|']
+    lines += [f'| {rng.choice(WORDS)} | {rng.randint(1, 9)}.{rng.randint(0, 20)} | {sentence(rng, 6)} |'
+              for _ in range(rows)]
+    return '\n'.join(lines)
+
+
+def png_bytes(width, height):
+    """A valid (solid grey) PNG, so image probing reads real headers"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + b'\x80' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def article(rng, index, spec, images_dir):
+    """Frontmatter and a markdown body of about spec['body_kb'] KB"""
+    lines = ['---', f'title: "Synthetic Article {index}"',
+             f'date: "{rng.randint(2015, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"',
+             f'excerpt: "{sentence(rng, 10)}"', 'tags:', f'  - {rng.choice(WORDS)}', f'  - {rng.choice(WORDS)}',
+             '---', '', f'# Synthetic Article {index}', '']
+    target = spec['body_kb'] * 1024
+    size = 0
+    section = 0
+    while size < target:
+        section += 1
+        block = [f'## Section {section}', '', paragraph(rng), '']
+        if section % 3 == 0:
+            block += [f'- {sentence(rng, 6)}' for _ in range(4)] + ['']
+        if section % 4 == 0:
+            block += ['```', *(f'{rng.choice(WORDS)} = "{rng.choice(WORDS)}"' for _ in range(5)), '```', '']
+        if section % 5 == 0:
+            block += [data_table(rng, spec['table_rows']), '']
+        if rng.random() < spec['image_density']:
+            name = f'article-{index}-{section}.png'
+            (images_dir / name).write_bytes(png_bytes(rng.choice([64, 96, 128]), rng.choice([48, 72])))
+            block += [f'![{rng.choice(WORDS)}](images/{name})', '']
+        text = '\n'.join(block)
+        lines.append(text)
+        size += len(text)
+    return '\n'.join(lines) + '\n'
+
+
+def software_list(rng, index, spec):
+    lines = [f'# Software List {index}', '', sentence(rng, 20), '', '---', '']
+    for era in ERAS:
+        lines += [f'## {era}', '', software_table(rng, spec['table_rows']), '', '---', '']
+    lines += ['## Common Traits of Long-Lasting Software', '']
+    lines += [f'{n}. **{rng.choice(WORDS).title()}** — {sentence(rng, 10)}' for n in range(1, 7)]
+    lines += ['', '---', '', '*Document compiled November 2025*']
+    return '\n'.join(lines) + '\n'
+
+
+def portfolio_page(rng, index, pages_dir):
+    name = f'project{index}'
+    images = []
+    for number in range(3):
+        image = f'{name}_{number}.png'
+        (pages_dir / name).mkdir(parents=True, exist_ok=True)
+        (pages_dir / name / image).write_bytes(png_bytes(96, 64))
+        images.append(f'/_pages/{name}/{image}')
+    lines = ['---', f'title: "Project {index}"', f'excerpt: "{sentence(rng, 6)}"',
+             f'date: "{rng.randint(2005, 2020)}-{rng.randint(1, 12):02d}-01"', 'header:',
+             f'    teaser: _pages/{name}/{name}_0.png', 'gallery:']
+    for number, image in enumerate(images):
+        lines += [f'  - url: {image}', f'    image_path: {image}', f'    alt: "image {number}"']
+    lines += ['tags:', f'  - {rng.choice(WORDS)}', '---', '', str(rng.randint(2005, 2020)), '',
+              paragraph(rng), '', '{% include gallery caption="gallery." %}']
+    return '\n'.join(lines) + '\n'
+
+
+def index_page(rng, posts):
+    lines = ['# Stempy Editions', '', '## Collections on Durable Software Development', '',
+             'Notes, research, and curated content', '', '---', '', '## Published & Upcoming', '']
+    for title, href in posts:
+        lines += [f'### {title}',
+                  f'**Status:** {rng.choice(STATUSES)} | Updated {rng.choice(MONTHS)} {rng.randint(2020, 2025)}',
+                  '', sentence(rng, 12), '', f'[Explore]({href})', '', '---', '']
+    lines.append('*Compiled November 2025 · New collections ship as they are ready*')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_corpus(root, spec=None):
+    """Write a synthetic site under root (replacing its docs/); returns the spec and file counts"""
+    spec = {**DEFAULT_SPEC, **(spec or {})}
+    rng = random.Random(spec['seed'])
+    root = Path(root)
+    docs = root / 'docs'
+    if docs.exists():
+        shutil.rmtree(docs)
+    posts_dir = docs / 'posts'
+    images_dir = posts_dir / 'images'
+    pages_dir = docs / 'portfolio' / '_pages'
+    images_dir.mkdir(parents=True)
+    pages_dir.mkdir(parents=True)
+
+    # Templates, CSS and config from the repo, so the converters run unchanged
+    for name in SITE_FILES:
+        if (REPO_ROOT / name).is_file():
+            shutil.copy2(REPO_ROOT / name, root / name)
+    for name in SITE_DIRS:
+        shutil.copytree(REPO_ROOT / name, root / name, dirs_exist_ok=True)
+
+    posts = []
+    for index in range(1, spec['articles'] + 1):
+        (posts_dir / f'article-{index}.md').write_text(article(rng, index, spec, images_dir), encoding='utf-8')
+        posts.append((f'Synthetic Article {index}', f'posts/article-{index}.html'))
+    for index in range(1, spec['software_lists'] + 1):
+        (posts_dir / f'software-list-{index}.md').write_text(software_list(rng, index, spec), encoding='utf-8')
+        posts.append((f'Software List {index}', f'posts/software-list-{index}.html'))
+    for index in range(1, spec['portfolio'] + 1):
+        (docs / 'portfolio' / f'project{index}.md').write_text(portfolio_page(rng, index, pages_dir),
+                                                               encoding='utf-8')
+    (docs / 'index.md').write_text(index_page(rng, posts), encoding='utf-8')
+
+    markdown_files = list(docs.rglob('*.md'))
+    return {'spec': spec, 'files': len(markdown_files),
+            'bytes': sum(path.stat().st_size for path in markdown_files),
+            'images': sum(1 for _ in docs.rglob('*.png'))}
+
+
+def load_corpus(docs_dir):
+    """Load the markdown bodies of every file under docs_dir (shared by the benchmark scripts)"""
+    # Imported here so generating a corpus does not need the repo root on sys.path
+    from convert_md_to_html_jinja2 import parse_frontmatter
+
+    bodies = []
+    for md_file in sorted(Path(docs_dir).rglob('*.md')):
+        _, body = parse_frontmatter(md_file.read_text(encoding='utf-8'))
+        bodies.append((md_file, body))
+    return bodies
+
+
+def add_spec_arguments(parser):
+    """--articles, --body-kb etc. for the corpus settings"""
+    for key, default in DEFAULT_SPEC.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(default), default=default,
+                            help=f'Corpus setting (default: {default})')
+
+
+def spec_from_args(args):
+    return {key: getattr(args, key) for key in DEFAULT_SPEC}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic corpus shaped like docs/')
+    parser.add_argument('root', help='Directory to write the site to (its docs/ is replaced)')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    summary = generate_corpus(args.root, spec_from_args(args))
+    print(f"Generated {summary['files']} markdown files ({summary['bytes'] / 1024:.0f} KB) "
+          f"and {summary['images']} images in {args.root}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite with regression tracking
+Generates a synthetic corpus, times the converter's stages on it (frontmatter, markdown,
+software list and index parsing, template rendering, full and no-op builds) and appends
+the samples to a JSON history. `compare` tests two runs with a Mann-Whitney U test and
+flags the benchmarks that got significantly slower.
+
+    python -m benchmarks.suite run --label baseline
+    python -m benchmarks.suite compare            # previous run vs latest
+    python -m benchmarks.suite list
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import convert_md_to_html_jinja2 as converter  # noqa: E402
+from benchmarks.corpus import add_spec_arguments, generate_corpus, spec_from_args  # noqa: E402
+
+HISTORY_VERSION = 1
+DEFAULT_HISTORY = REPO_ROOT / 'benchmarks' / 'history.json'
+
+# A sample of a fast benchmark repeats the pass until it takes at least this long
+MIN_SAMPLE_SECONDS = 0.05
+
+# Above this many samples per side (or with ties) the normal approximation is used
+EXACT_TEST_LIMIT = 20
+
+
+# --- Timing -------------------------------------------------------------------------
+
+def measure(func, repeat, setup=None, calibrate=True):
+    """Seconds per call of func, one value per sample
+
+    With calibrate, each sample runs func enough times to last MIN_SAMPLE_SECONDS
+    (and is divided by that count), so timer resolution does not dominate.
+    setup runs before every sample and is not timed.
+    """
+    loops = 1
+    if calibrate:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / max(elapsed, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return samples
+
+
+def load_sources(docs):
+    """(path, content, frontmatter, body) of every markdown file in the corpus"""
+    sources = []
+    for md_file in sorted(Path(docs).rglob('*.md')):
+        content = md_file.read_text(encoding='utf-8')
+        frontmatter, body = converter.parse_frontmatter(content)
+        sources.append((md_file, content, frontmatter, body))
+    return sources
+
+
+def clean_build(site):
+    """Remove the output, caches and manifest of a previous build"""
+    for name in ('w', '.cache', '.w-build-manifest.json'):
+        path = site / name
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+
+
+def run_main(argv):
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.main(argv)
+
+
+def run_benchmarks(site, repeat, main_repeat, only=None):
+    """{name: {'items': n, 'samples': [...]}} for the corpus in site (the working directory)"""
+    config = converter.load_config()
+    sources = load_sources(site / 'docs')
+    articles, lists, indexes = [], [], []
+    for md_file, content, frontmatter, body in sources:
+        content_type, _ = converter.determine_content_type(md_file.relative_to(site), config, content)
+        if content_type == 'index':
+            indexes.append(body)
+        elif content_type == 'software_list':
+            lists.append(body)
+        elif content_type == 'posts':
+            articles.append(body)
+
+    # Template data as render_page() builds it, so rendering is timed on its own
+    jinja_env = converter.setup_jinja_env(config)
+    base = {'title': 'Benchmark', 'css_files': ['../../css/styles.css'], 'footer_text': 'Stempy Articles'}
+    renders = [(jinja_env.get_template('article.j2.html'),
+                {**base, 'accent_color': converter.get_accent_color(index, config), 'back_link': '../../index.html',
+                 'date': 'November 2025', 'excerpt': '', 'body_content': converter.markdown_to_html(body, config)})
+               for index, body in enumerate(articles)]
+    renders += [(jinja_env.get_template('software-list.j2.html'), {**base, **converter.parse_software_list(body, config)})
+                for body in lists]
+    renders += [(jinja_env.get_template('index.j2.html'), {**base, **converter.parse_index_content(body, config)})
+                for body in indexes]
+
+    benchmarks = {
+        'parse_frontmatter': (len(sources), lambda: [converter.parse_frontmatter(source[1]) for source in sources]),
+        'markdown_to_html': (len(articles), lambda: [converter.markdown_to_html(body, config) for body in articles]),
+        'parse_software_list': (len(lists), lambda: [converter.parse_software_list(body, config) for body in lists]),
+        'parse_index_content': (len(indexes), lambda: [converter.parse_index_content(body, config) for body in indexes]),
+        'render_templates': (len(renders), lambda: [template.render(**data) for template, data in renders]),
+    }
+    results = {}
+    for name, (items, func) in benchmarks.items():
+        if only and name not in only:
+            continue
+        results[name] = {'items': items, 'samples': measure(func, repeat)}
+        print(f"  {name:<22} {format_seconds(statistics.median(results[name]['samples']))}")
+
+    # Full builds from scratch, then no-op rebuilds (everything up to date)
+    if not only or 'main_full' in only:
+        results['main_full'] = {'items': len(sources), 'samples': measure(
+            lambda: run_main(['--force']), main_repeat, setup=lambda: clean_build(site), calibrate=False)}
+        print(f"  {'main_full':<22} {format_seconds(statistics.median(results['main_full']['samples']))}")
+    if not only or 'main_noop' in only:
+        run_main([])
+        results['main_noop'] = {'items': len(sources), 'samples': measure(
+            lambda: run_main([]), main_repeat, calibrate=False)}
+        print(f"  {'main_noop':<22} {format_seconds(statistics.median(results['main_noop']['samples']))}")
+    return results
+
+
+# --- History --------------------------------------------------------------------------
+
+def load_history(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        return {'version': HISTORY_VERSION, 'runs': []}
+    history.setdefault('runs', [])
+    return history
+
+
+def save_history(path, history):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.tmp-{os.getpid()}')
+    tmp_path.write_text(json.dumps(history, indent=1) + '\n', encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def git_revision():
+    """Short commit hash of the repo (with '+' when the tree has changes), or None"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+
+def find_run(runs, reference):
+    """A run by position (-1 = latest), label or commit prefix"""
+    try:
+        return runs[int(reference)]
+    except ValueError:
+        pass
+    except IndexError:
+        raise SystemExit(f"No run at position {reference} ({len(runs)} runs in the history)")
+    for run in reversed(runs):
+        if run.get('label') == reference or (run.get('commit') or '').startswith(reference):
+            return run
+    raise SystemExit(f"No run with label or commit '{reference}'")
+
+
+# --- Statistics -----------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def _u_counts(n, m):
+    """Number of orderings of n + m values giving each Mann-Whitney U (no ties)"""
+    if n == 0 or m == 0:
+        return (1,)
+    counts = [0] * (n * m + 1)
+    # The largest value is either one of the n (adding m to U) or one of the m
+    for u, count in enumerate(_u_counts(n - 1, m)):
+        counts[u + m] += count
+    for u, count in enumerate(_u_counts(n, m - 1)):
+        counts[u] += count
+    return tuple(counts)
+
+
+def mann_whitney(base, candidate):
+    """Two-sided p-value that base and candidate samples come from the same distribution"""
+    n, m = len(candidate), len(base)
+    if not n or not m:
+        return 1.0
+    u = sum(1.0 if c > b else 0.5 if c == b else 0.0 for c in candidate for b in base)
+    pooled = sorted(base + candidate)
+    ties = len(pooled) != len(set(pooled))
+    if not ties and n <= EXACT_TEST_LIMIT and m <= EXACT_TEST_LIMIT:
+        counts = _u_counts(n, m)
+        total = sum(counts)
+        lower = sum(counts[:int(u) + 1]) / total
+        upper = sum(counts[int(u):]) / total
+        return min(1.0, 2 * min(lower, upper))
+
+    # Normal approximation with tie correction and continuity correction
+    tie_sizes = [pooled.count(value) for value in set(pooled)]
+    variance = n * m / 12 * ((n + m + 1) - sum(t ** 3 - t for t in tie_sizes) / ((n + m) * (n + m - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n * m / 2) - 0.5) / math.sqrt(variance)
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def compare_runs(base, candidate, alpha, threshold):
+    """Rows of (name, base median, candidate median, change, p-value, verdict)"""
+    rows = []
+    for name, result in candidate['results'].items():
+        if name not in base['results']:
+            continue
+        base_samples = base['results'][name]['samples']
+        samples = result['samples']
+        before, after = statistics.median(base_samples), statistics.median(samples)
+        change = (after - before) / before if before else 0.0
+        p_value = mann_whitney(base_samples, samples)
+        verdict = ''
+        if p_value < alpha and abs(change) * 100 >= threshold:
+            verdict = 'REGRESSION' if change > 0 else 'improved'
+        rows.append((name, before, after, change, p_value, verdict))
+    return rows
+
+
+# --- Commands -------------------------------------------------------------------------
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} µs"
+
+
+def command_run(args):
+    site = Path(args.site) if args.site else Path(tempfile.mkdtemp(prefix='bench-site-'))
+    summary = generate_corpus(site, spec_from_args(args))
+    print(f"Corpus: {summary['files']} markdown files ({summary['bytes'] / 1024:.0f} KB), "
+          f"{summary['images']} images in {site}")
+
+    # The converter reads its config and sources relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(site)
+    try:
+        results = run_benchmarks(site.resolve(), args.repeat, args.main_repeat, set(args.only or []))
+    finally:
+        os.chdir(cwd)
+        if not args.site:
+            shutil.rmtree(site, ignore_errors=True)
+
+    history = load_history(args.history)
+    history['runs'].append({
+        'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'label': args.label,
+        'commit': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'corpus': summary['spec'],
+        'results': results,
+    })
+    save_history(args.history, history)
+    print(f"Saved run {len(history['runs'])} to {args.history}")
+
+
+def command_compare(args):
+    runs = load_history(args.history)['runs']
+    if len(runs) < 2 and (args.base is None or args.candidate is None):
+        raise SystemExit(f"Need at least two runs in {args.history} to compare")
+    base = find_run(runs, args.base if args.base is not None else '-2')
+    candidate = find_run(runs, args.candidate if args.candidate is not None else '-1')
+    if base['corpus'] != candidate['corpus']:
+        print("Warning: the runs used different corpus settings")
+    if (base.get('platform'), base.get('python')) != (candidate.get('platform'), candidate.get('python')):
+        print("Warning: the runs were made on different platforms or Python versions")
+
+    def describe(run):
+        return ' '.join(part for part in (run['timestamp'], run.get('label'), run.get('commit')) if part)
+
+    print(f"Base:      {describe(base)}")
+    print(f"Candidate: {describe(candidate)}")
+    print()
+    print(f"{'Benchmark':<22} {'base':>10} {'candidate':>10} {'change':>8} {'p':>7}")
+    rows = compare_runs(base, candidate, args.alpha, args.threshold)
+    for name, before, after, change, p_value, verdict in rows:
+        print(f"{name:<22} {format_seconds(before):>10} {format_seconds(after):>10} "
+              f"{change * 100:>+7.1f}% {p_value:>7.3f}  {verdict}")
+
+    regressions = [row[0] for row in rows if row[5] == 'REGRESSION']
+    print()
+    if regressions:
+        print(f"{len(regressions)} significant regression(s) (p < {args.alpha}, slower by {args.threshold}% or more): "
+              f"{', '.join(regressions)}")
+        return 1
+    print(f"No significant regressions (p < {args.alpha}, threshold {args.threshold}%)")
+    return 0
+
+
+def command_list(args):
+    runs = load_history(args.history)['runs']
+    for position, run in enumerate(runs):
+        medians = ', '.join(f"{name} {format_seconds(statistics.median(result['samples']))}"
+                            for name, result in run['results'].items() if name.startswith('main'))
+        print(f"{position - len(runs):>4}  {run['timestamp']}  {run.get('label') or '-':<12} "
+              f"{run.get('commit') or '-':<10} {medians}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite with regression tracking')
+    parser.add_argument('--history', default=str(DEFAULT_HISTORY), help='JSON history file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Time the benchmarks on a synthetic corpus and append to the history')
+    run.add_argument('--label', help='Name for this run (e.g. a branch or change)')
+    run.add_argument('--repeat', type=int, default=9, help='Samples per stage benchmark')
+    run.add_argument('--main-repeat', type=int, default=5, help='Samples of the full and no-op builds')
+    run.add_argument('--only', nargs='+', metavar='NAME', help='Run only these benchmarks')
+    run.add_argument('--site', help='Generate the corpus here and keep it (default: a temporary directory)')
+    add_spec_arguments(run)
+
+    compare = commands.add_parser('compare', help='Flag significant regressions between two runs')
+    compare.add_argument('base', nargs='?', help='Run position, label or commit (default: -2)')
+    compare.add_argument('candidate', nargs='?', help='Run position, label or commit (default: -1)')
+    compare.add_argument('--alpha', type=float, default=0.01, help='Significance level (default: 0.01)')
+    compare.add_argument('--threshold', type=float, default=5.0,
+                         help='Ignore changes smaller than this many percent (default: 5)')
+
+    commands.add_parser('list', help='List the runs in the history')
+
+    args = parser.parse_args()
+    handlers = {'run': command_run, 'compare': command_compare, 'list': command_list}
+    return handlers[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
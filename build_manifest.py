@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Build manifest for incremental conversion
+Records content hashes of sources, config and templates so unchanged pages can be skipped
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+MANIFEST_VERSION = 2
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of a bytes object"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text):
+    """Return the SHA-256 hex digest of a string"""
+    return hash_bytes(text.encode('utf-8'))
+
+
+def hash_file(file_path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_config(config):
+    """Hash the parsed configuration in a key-order independent way"""
+    return hash_text(json.dumps(config, sort_keys=True, default=str))
+
+
+def compute_build_key(*parts):
+    """Combine the inputs of a single output into one key"""
+    return hash_text('\0'.join(str(part) for part in parts))
+
+
+def get_manifest_path(config):
+    """Determine where the build manifest is stored (next to the output root)"""
+    output_root = Path(config['output']['root_dir'])
+    manifest_file = config['output'].get('manifest_file')
+    if manifest_file:
+        return Path(manifest_file)
+    return output_root.parent / f'.{output_root.name}-build-manifest.json'
+
+
+def new_manifest(config_hash):
+    """Create an empty manifest for the current build"""
+    return {
+        'version': MANIFEST_VERSION,
+        'config_hash': config_hash,
+        'sources': [],
+        'templates': {},
+        'pages': {},
+        'copies': {}
+    }
+
+
+def load_manifest(manifest_path):
+    """Load a previous build manifest, returning an empty one if missing or unreadable"""
+    manifest_path = Path(manifest_path)
+    if not manifest_path.exists():
+        return new_manifest('')
+
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return new_manifest('')
+
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return new_manifest('')
+
+    manifest.setdefault('templates', {})
+    manifest.setdefault('pages', {})
+    manifest.setdefault('copies', {})
+    return manifest
+
+
+def save_manifest(manifest, manifest_path):
+    """Write the manifest atomically so an interrupted build never leaves it half-written"""
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    tmp_path.replace(manifest_path)
+
+
+def is_up_to_date(previous_manifest, section, source_key, build_key, output_file):
+    """Check whether an output was built from exactly the same inputs and still exists"""
+    entry = previous_manifest.get(section, {}).get(source_key)
+    if not entry or entry.get('key') != build_key:
+        return False
+    return Path(output_file).exists()
+
+
+def record_entry(manifest, section, source_key, build_key, source_hash, output_file, dependencies=None):
+    """Record a built (or verified) output in the manifest"""
+    entry = {
+        'key': build_key,
+        'source_hash': source_hash,
+        'output': Path(output_file).as_posix()
+    }
+    if dependencies is not None:
+        entry['dependencies'] = sorted(dependencies)
+    manifest[section][source_key] = entry
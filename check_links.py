@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Internal link and asset checker for the generated site
+Indexes every file under the site root once, then scans the emitted HTML pages in
+parallel and resolves each local href/src/srcset against that index. Broken
+links are reported as file:line, with a hint when only the letter case differs (the
+static host is case-sensitive).
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+
+from yaml_loader import load_yaml_config
+
+DEFAULT_EXCLUDE_DIRS = ['.git', '.cache', 'node_modules', '__pycache__']
+
+# Below this many pages a process pool costs more than it saves
+PARALLEL_THRESHOLD = 200
+
+# Anchored on the '=' so the regex engine can skip ahead to candidates; the attribute name
+# is checked by the lookbehinds (href, src and srcset, in any letter case)
+URL_ATTRIBUTE_PATTERN = re.compile(r'''=(?:(?<=[\s"'](?i:href)=)|(?<=[\s"'](?i:src)=)|(?<=[\s"'](?i:srcset)=))'''
+                                   r'''\s*(?:"([^"]*)"|'([^']*)')''')
+EXTERNAL_PREFIXES = ('http:', 'https:', '//', 'mailto:', 'tel:', 'javascript:', 'data:', '#')
+
+# Per-process state for pool workers: the path index is sent once per worker
+_worker_state = {}
+
+
+def index_site(site_root, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """Set of all file paths under site_root (relative, '/'-separated)"""
+    site_root = os.path.normpath(site_root)
+    exclude = set(exclude_dirs)
+    paths = set()
+    for directory, dirnames, filenames in os.walk(site_root):
+        dirnames[:] = [name for name in dirnames if name not in exclude]
+        relative = os.path.relpath(directory, site_root)
+        prefix = '' if relative == '.' else relative.replace(os.sep, '/') + '/'
+        paths.update(prefix + name for name in filenames)
+    return paths
+
+
+def _attribute_name(html, equals_position):
+    name = html[max(0, equals_position - 6):equals_position].lower()
+    return 'srcset' if name == 'srcset' else 'src' if name.endswith('src') else 'href'
+
+
+def _urls(attribute, value):
+    if attribute != 'srcset':
+        return [value]
+    # "image-480w.jpg 480w, image-960w.jpg 960w"
+    return [candidate.split()[0] for candidate in value.split(',') if candidate.split()]
+
+
+def resolve_url(url, page_dir):
+    """Site-relative path a local URL points to, or None for external links and fragments"""
+    url = url.strip()
+    if not url or url.lower().startswith(EXTERNAL_PREFIXES):
+        return None
+    path = unquote(url.split('#', 1)[0].split('?', 1)[0])
+    if not path:
+        return None
+    joined = path.lstrip('/') if path.startswith('/') else f'{page_dir}/{path}' if page_dir else path
+    resolved = os.path.normpath(joined).replace(os.sep, '/')
+    if path.endswith('/') or resolved == '.':
+        resolved = 'index.html' if resolved == '.' else f'{resolved}/index.html'
+    return resolved
+
+
+def check_page(page, paths, lowercase_paths):
+    """Number of local links checked and the broken ones as (line number, attribute, url, hint)"""
+    page_dir = os.path.dirname(page)
+    resolved = _worker_state.setdefault('resolved', {})
+    with open(_worker_state['site_root'] / page, 'r', encoding='utf-8', errors='replace') as f:
+        html = f.read()
+
+    broken = []
+    checked = 0
+    line_number, line_start = 1, 0
+    for match in URL_ATTRIBUTE_PATTERN.finditer(html):
+        attribute = _attribute_name(html, match.start())
+        value = match.group(1) if match.group(1) is not None else match.group(2)
+        for url in _urls(attribute, value):
+            # Pages of a section share most of their links, so resolve each once per directory
+            key = (page_dir, url)
+            if key not in resolved:
+                resolved[key] = resolve_url(url, page_dir)
+            target = resolved[key]
+            if target is None:
+                continue
+            checked += 1
+            if target in paths:
+                continue
+            if target.startswith('../'):
+                hint = 'points outside the site root'
+            elif target.lower() in lowercase_paths:
+                hint = f'case differs from {lowercase_paths[target.lower()]}'
+            else:
+                hint = 'not found'
+            # Line numbers are only counted for broken links, from the previous one onwards
+            line_number += html.count('\n', line_start, match.start())
+            line_start = match.start()
+            broken.append((line_number, attribute, url, hint))
+    return page, checked, broken
+
+
+def _init_worker(site_root, paths):
+    _worker_state['site_root'] = Path(site_root)
+    _worker_state['paths'] = paths
+    _worker_state['lowercase_paths'] = {path.lower(): path for path in paths}
+
+
+def _check_pages_in_worker(pages):
+    return [check_page(page, _worker_state['paths'], _worker_state['lowercase_paths']) for page in pages]
+
+
+def check_links(site_root, output_dir, jobs=None, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """Check every HTML page under output_dir; returns a summary dict with the broken links"""
+    start = time.perf_counter()
+    site_root = Path(site_root)
+    paths = index_site(site_root, exclude_dirs)
+    output_prefix = os.path.relpath(output_dir, site_root).replace(os.sep, '/')
+    pages = sorted(path for path in paths
+                   if path.endswith('.html') and (output_prefix == '.' or path.startswith(output_prefix + '/')))
+    index_seconds = time.perf_counter() - start
+
+    workers = jobs or os.cpu_count() or 1
+    if len(pages) >= PARALLEL_THRESHOLD and workers > 1:
+        # Contiguous batches keep the inter-process traffic to a few messages per worker
+        size = max(1, len(pages) // (workers * 4))
+        batches = [pages[index:index + size] for index in range(0, len(pages), size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(site_root, paths)) as executor:
+            results = [result for batch in executor.map(_check_pages_in_worker, batches) for result in batch]
+    else:
+        _init_worker(site_root, paths)
+        results = _check_pages_in_worker(pages)
+
+    broken = [(page, *link) for page, _, links in results for link in links]
+    return {'files': len(paths), 'pages': len(pages), 'links': sum(checked for _, checked, _ in results),
+            'broken': broken, 'index_seconds': index_seconds, 'seconds': time.perf_counter() - start}
+
+
+def format_report(summary, site_root, limit=None):
+    """file:line lines for the broken links, then a one-line summary"""
+    lines = []
+    for page, line_number, attribute, url, hint in summary['broken'][:limit]:
+        lines.append(f"{Path(site_root) / page}:{line_number}: broken {attribute} \"{url}\" ({hint})")
+    if limit is not None and len(summary['broken']) > limit:
+        lines.append(f"... and {len(summary['broken']) - limit} more")
+    lines.append(f"Link check: {summary['links']} links in {summary['pages']} pages, "
+                 f"{len(summary['broken'])} broken ({summary['files']} files indexed in "
+                 f"{summary['index_seconds'] * 1000:.0f} ms, {summary['seconds'] * 1000:.0f} ms total)")
+    return lines
+
+
+def link_check_settings(config):
+    """The `link_check` config section, or None when the post-build check is disabled"""
+    settings = config.get('link_check') or {}
+    if not settings.get('enabled', False):
+        return None
+    return settings
+
+
+def run_link_check(config, jobs=None):
+    """Post-build check described by the `link_check` config section; returns the summary or None"""
+    settings = link_check_settings(config)
+    if not settings:
+        return None
+    site_root = settings.get('site_root', '.')
+    summary = check_links(site_root, config['output']['root_dir'], jobs,
+                          settings.get('exclude_dirs', DEFAULT_EXCLUDE_DIRS))
+    print('\n'.join(format_report(summary, site_root, settings.get('report_limit', 50))))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check internal links and assets of the generated site')
+    parser.add_argument('output_dir', nargs='?', help='Pages to check (default: output.root_dir from the config)')
+    parser.add_argument('--site-root', help='Directory the site is served from (default: link_check.site_root or .)')
+    parser.add_argument('--config', default='convert_config_generic.yml', help='Config file')
+    parser.add_argument('--jobs', '-j', type=int, default=0, metavar='N',
+                        help='Worker processes (0 = one per CPU)')
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.config)
+    settings = config.get('link_check') or {}
+    site_root = args.site_root or settings.get('site_root', '.')
+    summary = check_links(site_root, args.output_dir or config['output']['root_dir'], args.jobs or None,
+                          settings.get('exclude_dirs', DEFAULT_EXCLUDE_DIRS))
+    print('\n'.join(format_report(summary, site_root)))
+    sys.exit(1 if summary['broken'] else 0)
+
+
+if __name__ == '__main__':
+    main()
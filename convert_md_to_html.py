@@ -6,10 +6,17 @@ Converts all markdown files under a directory tree to HTML while preserving stru
 
 import os
 import re
-import yaml
+import argparse
 from pathlib import Path
 from datetime import datetime
 
+from html_minify import format_minify_report, minify_cached, minify_enabled
+from image_probe import add_image_hints, open_image_probe, relative_image_resolver
+from output_files import new_write_counts, write_if_changed
+from parse_cache import open_parse_cache
+from profiler import BUILD, add_profile_arguments, finish_profile, open_profiler
+from yaml_loader import YAMLError, load_yaml_config, safe_load
+
 
 def load_config(config_file='convert_config_generic.yml'):
     """Load configuration from YAML file"""
@@ -17,8 +24,7 @@ def load_config(config_file='convert_config_generic.yml'):
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_file}")
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return load_yaml_config(config_path)
 
 
 def parse_frontmatter(content):
@@ -48,10 +54,10 @@ def parse_frontmatter(content):
     body = parts[2].strip()
 
     try:
-        frontmatter = yaml.safe_load(frontmatter_text)
+        frontmatter = safe_load(frontmatter_text)
         if frontmatter is None:
             frontmatter = {}
-    except yaml.YAMLError:
+    except YAMLError:
         # Fallback to simple parsing if YAML fails
         frontmatter = {}
         for line in frontmatter_text.split('\n'):
@@ -918,9 +924,14 @@ def find_markdown_files(root_dir, config):
     return sorted(md_files)
 
 
-def main():
+def main(argv=None):
     """Main conversion function"""
+    parser = argparse.ArgumentParser(description='Convert markdown files to HTML using the HTML templates')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
     config = load_config()
+    profiler = open_profiler(args.profile)
 
     source_root = Path(config['source']['root_dir'])
 
@@ -937,45 +948,70 @@ def main():
     print()
 
     converted = 0
+    write_counts = new_write_counts()
+    image_probe = open_image_probe(config)
+    minify = minify_enabled(config)
+    parse_cache = open_parse_cache(config) if minify else None
+    minify_bytes = [0, 0]
 
     for index, md_file in enumerate(md_files):
         try:
             print(f"Converting: {md_file.relative_to(source_root)}")
 
             # Read markdown file
-            content = md_file.read_text(encoding='utf-8')
+            with profiler.span('read', md_file):
+                content = md_file.read_text(encoding='utf-8')
 
             # Parse frontmatter and body
-            frontmatter, body = parse_frontmatter(content)
+            with profiler.span('frontmatter', md_file):
+                frontmatter, body = parse_frontmatter(content)
 
             # Ensure there's always a title - fallback to formatted filename
             if 'title' not in frontmatter or not frontmatter['title']:
                 frontmatter['title'] = format_filename_as_title(md_file.name)
 
             # Determine content type (pass content for detection)
-            content_type, content_type_config = determine_content_type(md_file, config, content)
+            with profiler.span('determine_content_type', md_file):
+                content_type, content_type_config = determine_content_type(md_file, config, content)
             print(f"  Type: {content_type}")
 
             # Convert markdown to HTML
-            body_html = markdown_to_html(body, config)
+            with profiler.span('markdown', md_file):
+                body_html = markdown_to_html(body, config)
+
+            # Determine output path
+            output_file = get_output_path(md_file, config, content_type_config)
+
+            # Intrinsic image sizes and loading hints (srcs resolve against the output, then the source)
+            if image_probe:
+                resolve = relative_image_resolver(output_file.parent, md_file.parent)
+                with profiler.span('image_hints', md_file):
+                    body_html = add_image_hints(body_html, resolve, image_probe)
 
             # Get accent color
             accent_color = get_accent_color(index, config)
 
             # Build HTML
-            html = build_html(frontmatter, body, body_html, accent_color,
-                            content_type_config, config)
+            with profiler.span('build_html', md_file):
+                html = build_html(frontmatter, body, body_html, accent_color,
+                                content_type_config, config)
 
-            # Determine output path
-            output_file = get_output_path(md_file, config, content_type_config)
+            # Minify the page (cached by content hash)
+            if minify:
+                minify_bytes[0] += len(html.encode('utf-8'))
+                with profiler.span('minify', md_file):
+                    html = minify_cached(html, parse_cache)
+                minify_bytes[1] += len(html.encode('utf-8'))
 
             # Create output directory
             output_file.parent.mkdir(parents=True, exist_ok=True)
 
-            # Write HTML file
-            output_file.write_text(html, encoding='utf-8')
+            # Write HTML file (left untouched when the content is unchanged)
+            with profiler.span('write', md_file):
+                write_status = write_if_changed(output_file, html)
+            write_counts[write_status] += 1
 
-            print(f"  → {output_file}")
+            print(f"  → {output_file}" + (" (unchanged)" if write_status == 'unchanged' else ""))
             print()
 
             converted += 1
@@ -984,7 +1020,17 @@ def main():
             print(f"  ERROR: {e}")
             print()
 
+    if image_probe:
+        with profiler.span('save_state', category=BUILD):
+            image_probe.save()
+
     print(f"Conversion complete! Converted {converted} of {len(md_files)} files.")
+    print(f"Output files: {write_counts['new']} new, {write_counts['updated']} updated, "
+          f"{write_counts['unchanged']} unchanged (not rewritten)")
+    if minify:
+        print(format_minify_report(*minify_bytes))
+
+    finish_profile(profiler, args.profile, args.profile_top)
 
 
 if __name__ == '__main__':
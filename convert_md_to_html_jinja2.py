@@ -6,10 +6,51 @@ Converts all markdown files under a directory tree to HTML while preserving stru
 
 import os
 import re
-import yaml
+import sys
+import json
+import time
+import shutil
+import argparse
+import tracemalloc
 from pathlib import Path
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import (
+    ChoiceLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader,
+    select_autoescape
+)
+
+from build_manifest import (
+    compute_build_key, get_manifest_path, hash_config, hash_file, hash_text,
+    is_up_to_date, load_manifest, new_manifest, record_entry, save_manifest
+)
+from assets import open_asset_fingerprinter
+from critical_css import (
+    critical_css_settings, inline_critical_css, purged_stylesheet_path, write_purged_stylesheet
+)
+from html_minify import format_minify_report, minify_cached, minify_enabled
+from image_probe import add_image_hints, open_image_probe, relative_image_resolver
+from markdown_engines import (  # noqa: F401  (markdown_to_html* are part of this module's API)
+    get_configured_engine_name, markdown_to_html, markdown_to_html_regex, render_markdown
+)
+from output_files import AtomicWriter, copy_file, new_write_counts, write_if_changed
+from parse_cache import make_cache_key, open_parse_cache
+from precompress import format_summary, precompress_output
+from check_links import run_link_check
+from profiler import BUILD, NULL_PROFILER, PAGE, add_profile_arguments, finish_profile, open_profiler
+from search_index import collect_text, html_to_text, make_search_document, open_search_index
+from sitemap_feed import open_sitemap_feed
+from template_deps import (
+    build_template_graph, hash_dependencies, resolve_css_paths, resolve_template_closure
+)
+from yaml_loader import YAMLError, load_yaml_config, safe_load
+
+# Written next to precompiled template modules to detect stale modules
+COMPILED_STAMP_FILE = 'templates.stamp'
+
+# Modules besides this one whose code shapes the rendered pages; their hashes are part of
+# every page's build key and of the parse cache keys
+RENDER_MODULES = ('markdown_engines', 'yaml_loader', 'image_probe', 'assets', 'html_minify', 'critical_css')
 
 
 def load_config(config_file='convert_config_generic.yml'):
@@ -18,20 +59,86 @@ def load_config(config_file='convert_config_generic.yml'):
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_file}")
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return load_yaml_config(config_path)
 
 
-def setup_jinja_env(config):
-    """Set up Jinja2 environment with template directory"""
-    templates_dir = config['source']['templates_dir']
-    env = Environment(
-        loader=FileSystemLoader(templates_dir),
+def get_compiled_templates_stamp(templates_dir):
+    """Stamp identifying the template sources a precompiled module set was built from"""
+    return hash_text(json.dumps(build_template_graph(None, templates_dir, {}, parse=False), sort_keys=True))
+
+
+def create_jinja_env(loader, bytecode_cache=None):
+    """Jinja2 environment with the options shared by rendering and --compile-templates
+
+    Precompiled modules only match what the build renders while both use the same
+    options, so any new environment option or filter belongs here.
+    """
+    return Environment(
+        loader=loader,
         autoescape=select_autoescape(['html', 'xml']),
         trim_blocks=True,
-        lstrip_blocks=True
+        lstrip_blocks=True,
+        bytecode_cache=bytecode_cache
     )
-    return env
+
+
+def setup_jinja_env(config):
+    """Set up Jinja2 environment with template directory
+
+    Compiled template bytecode is persisted in jinja.bytecode_cache_dir, and
+    modules precompiled with --compile-templates are preferred while they still
+    match the template sources.
+    """
+    templates_dir = config['source']['templates_dir']
+    jinja_config = config.get('jinja') or {}
+
+    loader = FileSystemLoader(templates_dir)
+    compiled_dir = jinja_config.get('compiled_templates_dir')
+    if compiled_dir:
+        stamp_file = Path(compiled_dir) / COMPILED_STAMP_FILE
+        if stamp_file.exists() and \
+                stamp_file.read_text(encoding='utf-8') == get_compiled_templates_stamp(templates_dir):
+            loader = ChoiceLoader([ModuleLoader(compiled_dir), loader])
+
+    bytecode_cache = None
+    bytecode_cache_dir = jinja_config.get('bytecode_cache_dir')
+    if bytecode_cache_dir:
+        Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+
+    return create_jinja_env(loader, bytecode_cache)
+
+
+def compile_templates(config):
+    """Precompile every template under templates_dir into importable Python modules"""
+    templates_dir = config['source']['templates_dir']
+    compiled_dir = (config.get('jinja') or {}).get('compiled_templates_dir')
+    if not compiled_dir:
+        print("Error: jinja.compiled_templates_dir is not configured")
+        return
+
+    env = create_jinja_env(FileSystemLoader(templates_dir))
+
+    compiled_path = Path(compiled_dir)
+    if compiled_path.exists():
+        shutil.rmtree(compiled_path)
+    compiled_path.mkdir(parents=True)
+
+    start = time.perf_counter()
+    compiled = []
+
+    def log_function(message):
+        if message.startswith('Compiled'):
+            compiled.append(message)
+        else:
+            print(f"  {message}")
+
+    env.compile_templates(compiled_path, zip=None, log_function=log_function)
+    (compiled_path / COMPILED_STAMP_FILE).write_text(get_compiled_templates_stamp(templates_dir),
+                                                     encoding='utf-8')
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"Compiled {len(compiled)} templates into {compiled_path} in {elapsed_ms:.1f} ms")
 
 
 def parse_frontmatter(content):
@@ -61,10 +168,10 @@ def parse_frontmatter(content):
     body = parts[2].strip()
 
     try:
-        frontmatter = yaml.safe_load(frontmatter_text)
+        frontmatter = safe_load(frontmatter_text)
         if frontmatter is None:
             frontmatter = {}
-    except yaml.YAMLError:
+    except YAMLError:
         # Fallback to simple parsing if YAML fails
         frontmatter = {}
         for line in frontmatter_text.split('\n'):
@@ -95,87 +202,6 @@ def format_filename_as_title(filename):
     return name.title()
 
 
-def markdown_to_html(text, config, rel_depth=2):
-    """Convert markdown to HTML"""
-    if not text:
-        return ""
-
-    # Remove Jekyll includes
-    text = re.sub(r'\{%.*?%\}', '', text)
-
-    # Images (before links, as they use similar syntax)
-    def convert_image(match):
-        alt = match.group(1)
-        src = match.group(2)
-        # Fix image path if needed
-        if src.startswith('/'):
-            src = '../' * rel_depth + src[1:]
-        return f'<img src="{src}" alt="{alt}" class="content-image">'
-    text = re.sub(r'!\[(.*?)\]\((.*?)\)', convert_image, text)
-
-    # Headers
-    text = re.sub(r'^#### (.*?)$', r'<h4>\1</h4>', text, flags=re.MULTILINE)
-    text = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', text, flags=re.MULTILINE)
-    text = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', text, flags=re.MULTILINE)
-    text = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', text, flags=re.MULTILINE)
-
-    # Bold and italic
-    text = re.sub(r'\*\*\*(.*?)\*\*\*', r'<strong><em>\1</em></strong>', text)
-    text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', text)
-    text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', text)
-
-    # Links
-    text = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', text)
-
-    # Code blocks with backticks
-    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
-
-    # Horizontal rules
-    text = re.sub(r'^---+$', '<hr>', text, flags=re.MULTILINE)
-
-    # Lists and paragraphs
-    lines = text.split('\n')
-    html_lines = []
-    in_list = False
-
-    for line in lines:
-        stripped = line.strip()
-
-        # Unordered lists
-        if stripped.startswith('- ') or stripped.startswith('* '):
-            if not in_list:
-                html_lines.append('<ul>')
-                in_list = True
-            html_lines.append(f'<li>{stripped[2:]}</li>')
-        else:
-            if in_list:
-                html_lines.append('</ul>')
-                in_list = False
-            html_lines.append(line)
-
-    if in_list:
-        html_lines.append('</ul>')
-
-    text = '\n'.join(html_lines)
-
-    # Paragraphs (simple approach)
-    paragraphs = text.split('\n\n')
-    html_paragraphs = []
-
-    for para in paragraphs:
-        para = para.strip()
-        if para:
-            # Don't wrap if already has HTML tags
-            if para.startswith('<'):
-                html_paragraphs.append(para)
-            else:
-                # Replace single newlines with <br>
-                para = para.replace('\n', '<br>\n')
-                html_paragraphs.append(f'<p>{para}</p>')
-
-    return '\n'.join(html_paragraphs)
-
-
 def is_software_list(content):
     """Check if markdown content is a software list with tables"""
     # Look for table headers that indicate a software list
@@ -644,7 +670,11 @@ def find_html_files(root_dir, config):
 
 
 def copy_html_file(source_file, config):
-    """Copy HTML file as-is to output directory, preserving structure"""
+    """Copy HTML file as-is to output directory, preserving structure
+
+    Returns (output_file, method, bytes moved); method is 'unchanged' when the
+    destination already matched.
+    """
     source_root = Path(config['source']['root_dir'])
     output_root = Path(config['output']['root_dir'])
 
@@ -652,31 +682,255 @@ def copy_html_file(source_file, config):
     try:
         rel_path = Path(source_file).relative_to(source_root)
     except ValueError:
-        return None
+        return None, None, 0
 
     # Determine output path (preserve directory structure)
     output_file = output_root / rel_path
 
-    # Create output directory
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    # Copy file (skipped when the destination already matches)
+    method, moved = copy_file(source_file, output_file,
+                              hardlink=config['output'].get('hardlink_copies', False))
 
-    # Copy file
-    import shutil
-    shutil.copy2(source_file, output_file)
+    return output_file, method, moved
 
-    return output_file
 
+# Buffer size for streamed page writes; chunks from template.generate() are small,
+# so they are coalesced here instead of hitting the OS for every chunk
+STREAM_BUFFER_SIZE = 16 * 1024
 
-def main():
-    """Main conversion function"""
-    config = load_config()
-    jinja_env = setup_jinja_env(config)
 
-    source_root = Path(config['source']['root_dir'])
+def write_streamed(template, template_data, output_file):
+    """Render a template chunk by chunk straight into a buffered file writer
 
-    if not source_root.exists():
-        print(f"Error: Source directory '{source_root}' not found")
-        return
+    Unlike template.render(), the complete page is never held in memory as one
+    string; peak memory is bounded by the template data and the largest chunk.
+    The page is hashed while it is written to a temp file, which only replaces
+    output_file if the content changed. Returns 'new', 'updated' or 'unchanged'.
+    """
+    with AtomicWriter(output_file, buffering=STREAM_BUFFER_SIZE) as writer:
+        for chunk in template.generate(**template_data):
+            writer.write(chunk)
+    return writer.status
+
+
+def format_bytes(size):
+    """Format a byte count for display"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def render_page(job, config, jinja_env, parse_cache=None, image_probe=None, assets=None):
+    """Parse, convert and render a single markdown page and write it to disk
+
+    Returns a result dict with the log lines for the page so callers can print
+    them in source order, regardless of which process did the work. With a
+    parse cache, frontmatter and body HTML are reused for unchanged content.
+    With an image probe, body images get their intrinsic size and loading hints;
+    with an asset fingerprinter, their srcs point at content-hashed copies.
+    With job['profile'], the result carries a span per stage for the trace.
+    """
+    md_file = job['md_file']
+    content_type_config = job['content_type_config']
+    output_file = job['output_file']
+    log = []
+    profiler = open_profiler(job.get('profile'))
+    page_start = time.perf_counter_ns()
+
+    if job.get('measure_memory') and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    cache_counts = (parse_cache.hits, parse_cache.misses) if parse_cache else (0, 0)
+    image_files = set()
+
+    try:
+        # Parse frontmatter and body (cached by content hash and parser code)
+        with profiler.span('frontmatter', md_file):
+            if parse_cache:
+                frontmatter, body = parse_cache.get_or_compute(
+                    'frontmatter', make_cache_key(job['source_hash'], job['code_hash']),
+                    lambda: parse_frontmatter(job['content']))
+            else:
+                frontmatter, body = parse_frontmatter(job['content'])
+
+        # Ensure there's always a title - fallback to formatted filename
+        if 'title' not in frontmatter or not frontmatter['title']:
+            frontmatter['title'] = format_filename_as_title(md_file.name)
+
+        # Prepare template data
+        template_data = {
+            'title': frontmatter.get('title', ''),
+            'css_files': job.get('css_files', content_type_config.get('css_files', [])),
+            'footer_text': config.get('defaults', {}).get('footer_text', 'Stempy Articles')
+        }
+
+        # Try Jinja2 template first, fallback to original (load/compile time is reported separately)
+        j2_template_name = job['template_name']
+        template_start = time.perf_counter()
+        try:
+            with profiler.span('template_load', md_file):
+                template = jinja_env.get_template(j2_template_name)
+        except:
+            # Fallback to non-j2 template (will need manual handling)
+            log.append(f"  Warning: No Jinja2 template found for {j2_template_name}, skipping...")
+            return {'status': 'skipped', 'log': log}
+        template_seconds = time.perf_counter() - template_start
+
+        # Process based on content type
+        if content_type_config.get('is_index'):
+            # Parse index content
+            with profiler.span('parse_index_content', md_file):
+                index_data = parse_index_content(body, config)
+            template_data.update(index_data)
+            search_text = ' '.join(collect_text(index_data)) if job.get('search') else ''
+            template_data['footer_text'] = f'Compiled <span>{index_data.get("date", "November 2025")}</span> · New collections ship as they are ready'
+
+        elif content_type_config.get('is_software_list'):
+            # Parse software list content
+            with profiler.span('parse_software_list', md_file):
+                list_data = parse_software_list(body, config)
+            template_data.update(list_data)
+            search_text = ' '.join(collect_text(list_data)) if job.get('search') else ''
+            template_data['footer_text'] = 'Compiled <span>November 2025</span> · A tribute to software that endures'
+
+        else:
+            # Standard article (accent color was assigned from the file's index in the serial pass)
+            with profiler.span('markdown', md_file):
+                if parse_cache:
+                    body_key = make_cache_key(hash_text(body), get_configured_engine_name(config), 2, job['code_hash'])
+                    body_html = parse_cache.get_or_compute('body_html', body_key,
+                                                           lambda: render_markdown(body, config))
+                else:
+                    body_html = render_markdown(body, config)
+            # Image srcs resolve against the output page first, then the source file;
+            # every image found is recorded as a dependency of the page
+            find_image = relative_image_resolver(output_file.parent, Path(md_file).parent)
+
+            def resolve(src):
+                path = find_image(src)
+                if path:
+                    image_files.add(Path(path).as_posix())
+                return path
+
+            if image_probe:
+                with profiler.span('image_hints', md_file):
+                    body_html = add_image_hints(body_html, resolve, image_probe)
+            if assets:
+                with profiler.span('fingerprint_assets', md_file):
+                    body_html = assets.rewrite_srcs(body_html, resolve, output_file)
+            search_text = html_to_text(body_html) if job.get('search') else ''
+            template_data.update({
+                'accent_color': job['accent_color'],
+                'back_link': content_type_config.get('back_link', '../index.html'),
+                'date': format_date(frontmatter.get('date', '')),
+                'excerpt': frontmatter.get('excerpt', ''),
+                'body_content': body_html
+            })
+
+        # Create output directory
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Peak memory of the render/write stage (Python allocations) when requested
+        if job.get('measure_memory'):
+            tracemalloc.reset_peak()
+            baseline_memory = tracemalloc.get_traced_memory()[0]
+
+        # Render template and write HTML file
+        minify_bytes = None
+        critical_bytes = 0
+        if job.get('stream'):
+            with profiler.span('render_write', md_file):
+                write_status = write_streamed(template, template_data, output_file)
+        else:
+            with profiler.span('render', md_file):
+                html = template.render(**template_data)
+            if job.get('critical_css'):
+                # Inline the rules this page uses, load the stylesheets asynchronously
+                settings = job['critical_css']
+                with profiler.span('critical_css', md_file):
+                    html, critical_bytes = inline_critical_css(
+                        html, output_file, settings['max_inline_kb'], settings['safelist'],
+                        job.get('purged_css_href'))
+            if job.get('minify'):
+                # Minify the whole page (cached by content hash)
+                before_bytes = len(html.encode('utf-8'))
+                with profiler.span('minify', md_file):
+                    html = minify_cached(html, parse_cache)
+                minify_bytes = (before_bytes, len(html.encode('utf-8')))
+            with profiler.span('write', md_file):
+                write_status = write_if_changed(output_file, html)
+
+        log.append(f"  → {output_file}" + (" (unchanged)" if write_status == 'unchanged' else ""))
+        result = {'status': 'converted', 'log': log, 'template_seconds': template_seconds,
+                  'write_status': write_status, 'image_files': sorted(image_files)}
+        if minify_bytes:
+            result['minify_bytes'] = minify_bytes
+        if job.get('critical_css'):
+            result['critical_bytes'] = critical_bytes
+        if job.get('search'):
+            # URLs are relative to the output root, like the index files
+            url = output_file.relative_to(config['output']['root_dir']).as_posix()
+            with profiler.span('search_document', md_file):
+                result['search_document'] = make_search_document(
+                    url, template_data['title'] or frontmatter['title'], search_text, frontmatter)
+        if image_probe:
+            result['image_probes'] = image_probe.take_new_entries()
+        if assets:
+            result['assets'] = assets.take_new_entries()
+        if parse_cache:
+            result['cache_hits'] = parse_cache.hits - cache_counts[0]
+            result['cache_misses'] = parse_cache.misses - cache_counts[1]
+
+        if job.get('measure_memory'):
+            result['peak_memory'] = tracemalloc.get_traced_memory()[1] - baseline_memory
+            log.append(f"  Peak memory: {format_bytes(result['peak_memory'])}")
+
+        if profiler.enabled:
+            # The whole page, around its stages (named after the file in the trace)
+            profiler.record(Path(md_file).as_posix(), PAGE, page_start, time.perf_counter_ns())
+            result['profile_events'] = profiler.take_events()
+
+        return result
+
+    except Exception as e:
+        import traceback
+        log.append(f"  ERROR: {e}")
+        log.append(traceback.format_exc().rstrip())
+        return {'status': 'error', 'log': log}
+
+
+# Per-process state for pool workers: each worker builds its Jinja environment once
+_worker_state = {}
+
+
+def _init_worker(config):
+    """Process pool initializer: load the Jinja environment once per worker"""
+    _worker_state['config'] = config
+    _worker_state['jinja_env'] = setup_jinja_env(config)
+    _worker_state['parse_cache'] = open_parse_cache(config)
+    _worker_state['image_probe'] = open_image_probe(config)
+    _worker_state['assets'] = open_asset_fingerprinter(config)
+
+
+def _render_page_in_worker(job):
+    """Render a page using the worker's own config and Jinja environment"""
+    return render_page(job, _worker_state['config'], _worker_state['jinja_env'],
+                       _worker_state['parse_cache'], _worker_state['image_probe'],
+                       _worker_state['assets'])
+
+
+def build_site(config, jinja_env, args, previous_manifest, changed=None, executor=None, log_unchanged=True,
+               profiler=NULL_PROFILER):
+    """Run one incremental build and return the new manifest
+
+    When `changed` is a set of paths (watch mode), pages whose source and
+    recorded dependencies are not in it are carried over from the previous
+    manifest without being read, as long as the set of source files is the same.
+    A recording profiler gets a span per stage of each page and per build step.
+    """
+    source_root = Path(config['source']['root_dir'])
 
     # Find all markdown files
     md_files = find_markdown_files(source_root, config)
@@ -684,111 +938,277 @@ def main():
     # Find all HTML files to copy
     html_files = find_html_files(source_root, config)
 
-    print(f"Found {len(md_files)} markdown files to convert")
-    print(f"Found {len(html_files)} HTML files to copy")
-    print(f"Source directory: {source_root}")
-    print(f"Output directory: {config['output']['root_dir']}")
-    print()
+    if log_unchanged:
+        print(f"Found {len(md_files)} markdown files to convert")
+        print(f"Found {len(html_files)} HTML files to copy")
+        print(f"Source directory: {source_root}")
+        print(f"Output directory: {config['output']['root_dir']}")
+        print()
+
+    # Hash the global build inputs
+    manifest_path = get_manifest_path(config)
+    config_hash = hash_config(config)
+    code_hash = compute_build_key(hash_file(__file__),
+                                  *(hash_file(sys.modules[name].__file__) for name in RENDER_MODULES))
+    manifest = new_manifest(config_hash)
+    manifest['sources'] = [md_file.as_posix() for md_file in md_files]
+
+    # Extract the template include/extends graph (unchanged templates reuse the persisted edges)
+    template_graph = build_template_graph(jinja_env, config['source']['templates_dir'],
+                                          previous_manifest.get('templates'))
+    manifest['templates'] = template_graph
+    file_hashes = {}
+
+    def page_build_key(source_hash, template_deps, file_paths, accent_color):
+        """Build key and manifest dependencies of a page from its inputs"""
+        file_paths = sorted(set(file_paths))
+        deps_hash = hash_dependencies(template_graph, template_deps, file_paths, file_hashes)
+        build_key = compute_build_key(source_hash, config_hash, deps_hash, code_hash, accent_color)
+        return build_key, sorted(template_deps) + [path.as_posix() for path in file_paths]
+
+    # Changed paths as both file paths and template names, for matching page dependencies
+    changed_keys = None
+    if changed is not None and previous_manifest.get('sources') == manifest['sources'] \
+            and previous_manifest.get('config_hash') == config_hash:
+        templates_root = Path(config['source']['templates_dir'])
+        changed_keys = set()
+        for path in changed:
+            changed_keys.add(Path(path).as_posix())
+            try:
+                changed_keys.add(Path(path).relative_to(templates_root).as_posix())
+            except ValueError:
+                pass
 
     converted = 0
     copied = 0
-
+    bytes_moved = 0
+    write_counts = new_write_counts()
+    skipped = 0
+    skipped_copies = 0
+    stream_render = args.stream or config['output'].get('stream_render', False)
+    peak_memory = []
+    parse_cache = open_parse_cache(config)
+    image_probe = open_image_probe(config)
+    assets = open_asset_fingerprinter(config)
+    cache_hits = 0
+    cache_misses = 0
+    template_seconds = 0.0
+    minify = minify_enabled(config)
+    minify_bytes = [0, 0]
+    critical_css = critical_css_settings(config)
+    critical_pages = [0, 0]
+    critical_bytes = 0
+    if stream_render and (minify or critical_css):
+        # Both post-passes rewrite the whole page, so it has to be rendered in one piece
+        passes = ' and '.join(name for name, enabled in (('minify', minify), ('critical_css', critical_css))
+                              if enabled)
+        print(f"Warning: streaming disabled, pages are rendered buffered for {passes}")
+        stream_render = False
+    search = open_search_index(config)
+    sitemap = open_sitemap_feed(config)
+    sitemap_pages = []
+
+    # Serial pass: hash sources, resolve dependencies and assign index-dependent
+    # values (accent colors) so the output does not depend on worker scheduling
+    pages = []
     for index, md_file in enumerate(md_files):
-        try:
-            print(f"Converting: {md_file.relative_to(source_root)}")
+        page = {'log': [f"Converting: {md_file.relative_to(source_root)}"], 'job': None}
+        pages.append(page)
+        source_key = md_file.as_posix()
+
+        # Watch mode: carry over pages that none of the changed paths affect
+        previous_entry = previous_manifest['pages'].get(source_key)
+        if changed_keys is not None and previous_entry and source_key not in changed_keys \
+                and not changed_keys.intersection(previous_entry.get('dependencies', [])) \
+                and Path(previous_entry['output']).exists():
+            manifest['pages'][source_key] = previous_entry
+            sitemap_pages.append((md_file, previous_entry['source_hash'], previous_entry['output']))
+            page['log'].append("  Unchanged, skipped")
+            page['unchanged'] = True
+            skipped += 1
+            continue
 
+        try:
             # Read markdown file
-            content = md_file.read_text(encoding='utf-8')
+            with profiler.span('read', md_file):
+                content = md_file.read_text(encoding='utf-8')
+                source_hash = hash_text(content)
 
-            # Parse frontmatter and body
-            frontmatter, body = parse_frontmatter(content)
+            # Determine content type (pass content for detection)
+            with profiler.span('determine_content_type', md_file):
+                content_type, content_type_config = determine_content_type(md_file, config, content)
+            page['log'].append(f"  Type: {content_type}")
 
-            # Ensure there's always a title - fallback to formatted filename
-            if 'title' not in frontmatter or not frontmatter['title']:
-                frontmatter['title'] = format_filename_as_title(md_file.name)
+            # Determine output path
+            output_file = get_output_path(md_file, config, content_type_config)
+            sitemap_pages.append((md_file, source_hash, output_file))
 
-            # Determine content type (pass content for detection)
-            content_type, content_type_config = determine_content_type(md_file, config, content)
-            print(f"  Type: {content_type}")
-
-            # Prepare template data
-            template_data = {
-                'title': frontmatter.get('title', ''),
-                'css_files': content_type_config.get('css_files', []),
-                'footer_text': config.get('defaults', {}).get('footer_text', 'Stempy Articles')
-            }
+            # Only standard articles depend on their position in the file list
+            is_article = not (content_type_config.get('is_index') or content_type_config.get('is_software_list'))
+            accent_color = get_accent_color(index, config) if is_article else ''
 
             # Get template name (use .j2.html if exists, fallback to .html)
             template_name = content_type_config.get('template', 'default.html')
             j2_template_name = template_name.replace('.html', '.j2.html')
 
-            # Try Jinja2 template first, fallback to original
-            try:
-                template = jinja_env.get_template(j2_template_name)
-            except:
-                # Fallback to non-j2 template (will need manual handling)
-                print(f"  Warning: No Jinja2 template found for {j2_template_name}, skipping...")
+            # The page depends on its template closure, the stylesheets it links and the
+            # images its body referenced in the previous build (the files that are not templates)
+            with profiler.span('dependencies', md_file):
+                template_deps = resolve_template_closure(template_graph, j2_template_name)
+                css_paths = resolve_css_paths(content_type_config.get('css_files', []), output_file)
+                image_paths = [Path(dependency) for dependency in (previous_entry or {}).get('dependencies', [])
+                               if dependency not in template_graph and dependency not in template_deps]
+                build_key, dependencies = page_build_key(source_hash, template_deps, css_paths + image_paths,
+                                                         accent_color)
+
+            # Skip pages whose inputs are identical to the previous build
+            entry = (source_key, build_key, source_hash, output_file, dependencies)
+            # (a page missing from the search index is rebuilt to index it)
+            if is_up_to_date(previous_manifest, 'pages', source_key, build_key, output_file) \
+                    and (not search or search.has_page(source_key, build_key)):
+                record_entry(manifest, 'pages', *entry)
+                manifest['pages'][source_key]['content_type'] = content_type
+                page['log'].append("  Unchanged, skipped")
+                page['unchanged'] = True
+                skipped += 1
                 continue
 
-            # Process based on content type
-            if content_type_config.get('is_index'):
-                # Parse index content
-                index_data = parse_index_content(body, config)
-                template_data.update(index_data)
-                template_data['footer_text'] = f'Compiled <span>{index_data.get("date", "November 2025")}</span> · New collections ship as they are ready'
-
-            elif content_type_config.get('is_software_list'):
-                # Parse software list content
-                list_data = parse_software_list(body, config)
-                template_data.update(list_data)
-                template_data['footer_text'] = 'Compiled <span>November 2025</span> · A tribute to software that endures'
-
-            else:
-                # Standard article
-                body_html = markdown_to_html(body, config)
-                accent_color = get_accent_color(index, config)
-                template_data.update({
-                    'accent_color': accent_color,
-                    'back_link': content_type_config.get('back_link', '../index.html'),
-                    'date': format_date(frontmatter.get('date', '')),
-                    'excerpt': frontmatter.get('excerpt', ''),
-                    'body_content': body_html
-                })
-
-            # Render template
-            html = template.render(**template_data)
-
-            # Determine output path
-            output_file = get_output_path(md_file, config, content_type_config)
-
-            # Create output directory
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-
-            # Write HTML file
-            output_file.write_text(html, encoding='utf-8')
-
-            print(f"  → {output_file}")
-            print()
-
-            converted += 1
+            page['entry'] = entry
+            page['key_inputs'] = (source_hash, template_deps, css_paths, accent_color)
+            page['content_type'] = content_type
+            page['job'] = {
+                'md_file': md_file,
+                'content': content,
+                'source_hash': source_hash,
+                'code_hash': code_hash,
+                'content_type_config': content_type_config,
+                'template_name': j2_template_name,
+                'accent_color': accent_color,
+                'output_file': output_file,
+                # The minifier and critical CSS need the whole page, so it renders buffered
+                'stream': stream_render,
+                'minify': minify,
+                'critical_css': critical_css,
+                'search': bool(search),
+                'measure_memory': args.memory_report,
+                'profile': profiler.enabled
+            }
+            if critical_css and critical_css['purge']:
+                page['job']['purged_css_href'] = Path(os.path.relpath(
+                    purged_stylesheet_path(config, content_type), output_file.parent)).as_posix()
+            if assets:
+                # Link the content-hashed stylesheet copies (their content is part of deps_hash)
+                page['job']['css_files'] = assets.rewrite_css_files(
+                    content_type_config.get('css_files', []), output_file)
 
         except Exception as e:
-            print(f"  ERROR: {e}")
             import traceback
-            traceback.print_exc()
-            print()
+            page['log'].append(f"  ERROR: {e}")
+            page['log'].append(traceback.format_exc().rstrip())
+
+    # Render pass: convert pages serially or across a process pool; results are
+    # consumed in source order so logs and the manifest are deterministic
+    jobs = [page['job'] for page in pages if page['job']]
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    workers = min(workers, len(jobs)) or 1
+
+    owns_executor = False
+    if workers > 1 and executor is None:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(config,))
+        owns_executor = True
+
+    if workers > 1:
+        results = executor.map(_render_page_in_worker, jobs,
+                               chunksize=max(1, len(jobs) // (workers * 4)))
+        print(f"Rendering {len(jobs)} pages with {workers} worker processes")
+        print()
+    else:
+        results = (render_page(job, config, jinja_env, parse_cache, image_probe, assets) for job in jobs)
+
+    render_start = time.perf_counter_ns()
+    try:
+        for page in pages:
+            if page['job']:
+                result = next(results)
+                page['log'].extend(result['log'])
+                profiler.extend(result.get('profile_events', []))
+                if result['status'] == 'converted':
+                    # The key covers the images this render actually used
+                    source_hash, template_deps, css_paths, accent_color = page['key_inputs']
+                    build_key, dependencies = page_build_key(
+                        source_hash, template_deps, css_paths + [Path(path) for path in result['image_files']],
+                        accent_color)
+                    page['entry'] = (page['entry'][0], build_key, source_hash, page['entry'][3], dependencies)
+                    record_entry(manifest, 'pages', *page['entry'])
+                    manifest['pages'][page['entry'][0]]['content_type'] = page['content_type']
+                    if search and 'search_document' in result:
+                        search.update_page(page['entry'][0], page['entry'][1], result['search_document'])
+                    converted += 1
+                    write_counts[result['write_status']] += 1
+                template_seconds += result.get('template_seconds', 0.0)
+                cache_hits += result.get('cache_hits', 0)
+                cache_misses += result.get('cache_misses', 0)
+                if image_probe and result.get('image_probes'):
+                    image_probe.update(result['image_probes'])
+                if 'critical_bytes' in result:
+                    critical_pages[0 if result['critical_bytes'] else 1] += 1
+                    critical_bytes += result['critical_bytes']
+                if 'minify_bytes' in result:
+                    minify_bytes[0] += result['minify_bytes'][0]
+                    minify_bytes[1] += result['minify_bytes'][1]
+                if assets and result.get('assets'):
+                    assets.update(result['assets'])
+                if 'peak_memory' in result:
+                    peak_memory.append((result['peak_memory'], page['job']['output_file']))
+            if log_unchanged or not page.get('unchanged'):
+                print('\n'.join(page['log']))
+                print()
+    finally:
+        if owns_executor:
+            executor.shutdown()
+    profiler.record('render_pages', BUILD, render_start, time.perf_counter_ns())
 
     # Copy HTML files
-    print("\n--- Copying HTML files ---\n")
+    if log_unchanged:
+        print("\n--- Copying HTML files ---\n")
+    copy_start = time.perf_counter_ns()
     for html_file in html_files:
         try:
-            print(f"Copying: {html_file.relative_to(source_root)}")
+            source_key = html_file.as_posix()
+            previous_entry = previous_manifest['copies'].get(source_key)
+            if changed_keys is not None and previous_entry and source_key not in changed_keys:
+                manifest['copies'][source_key] = previous_entry
+                skipped_copies += 1
+                continue
+
+            if log_unchanged:
+                print(f"Copying: {html_file.relative_to(source_root)}")
+
+            source_hash = hash_file(html_file)
+            output_file = Path(config['output']['root_dir']) / html_file.relative_to(source_root)
+            if is_up_to_date(previous_manifest, 'copies', source_key, source_hash, output_file):
+                record_entry(manifest, 'copies', source_key, source_hash, source_hash, output_file)
+                if log_unchanged:
+                    print(f"  Unchanged, skipped")
+                    print()
+                skipped_copies += 1
+                continue
+
+            if not log_unchanged:
+                print(f"Copying: {html_file.relative_to(source_root)}")
 
-            output_file = copy_html_file(html_file, config)
+            output_file, method, moved = copy_html_file(html_file, config)
 
             if output_file:
-                print(f"  → {output_file}")
-                copied += 1
+                record_entry(manifest, 'copies', source_key, source_hash, source_hash, output_file)
+                if method == 'unchanged':
+                    print(f"  → {output_file} (unchanged, not copied)")
+                    skipped_copies += 1
+                else:
+                    print(f"  → {output_file} ({method}, {format_bytes(moved)} moved)")
+                    copied += 1
+                    bytes_moved += moved
             else:
                 print(f"  Skipped")
 
@@ -797,8 +1217,242 @@ def main():
         except Exception as e:
             print(f"  ERROR: {e}")
             print()
+    profiler.record('copy_html', BUILD, copy_start, time.perf_counter_ns())
+
+    # Purged stylesheets: the rules used by any page of a content type (including skipped pages)
+    purged = []
+    if critical_css and critical_css['purge']:
+        purge_start = time.perf_counter_ns()
+        for content_type, type_config in config.get('content_types', {}).items():
+            outputs = [entry['output'] for entry in manifest['pages'].values()
+                       if entry.get('content_type') == content_type]
+            if outputs:
+                css_paths = resolve_css_paths(type_config.get('css_files', []), outputs[0])
+                sizes = write_purged_stylesheet(css_paths, outputs, purged_stylesheet_path(config, content_type),
+                                                critical_css['safelist'])
+                purged.append((content_type, *sizes))
+        profiler.record('purge_css', BUILD, purge_start, time.perf_counter_ns())
+
+    # Search shards for every page in the manifest (pages skipped this time keep their entries)
+    with profiler.span('search_index', category=BUILD):
+        search_summary = search.write(manifest['pages']) if search else None
+
+    # Sitemap and feed (frontmatter is only read for changed sources)
+    sitemap_summary = None
+    if sitemap:
+        with profiler.span('sitemap_feed', category=BUILD):
+            sitemap.update(sitemap_pages)
+            sitemap_summary = sitemap.write()
+
+    with profiler.span('save_state', category=BUILD):
+        save_manifest(manifest, manifest_path)
+
+        # Keep the parse cache within its size cap
+        evicted = parse_cache.evict() if parse_cache else 0
+        if image_probe:
+            image_probe.save()
+        # Fingerprinted copies are kept only for files a page still depends on
+        asset_manifest = None
+        if assets:
+            referenced = {dependency for entry in manifest['pages'].values()
+                          for dependency in entry.get('dependencies', [])}
+            asset_manifest = assets.save_manifest(referenced)
 
     print(f"Conversion complete! Converted {converted} of {len(md_files)} markdown files, copied {copied} of {len(html_files)} HTML files.")
+    print(f"Incremental build: rebuilt {converted} pages, skipped {skipped} unchanged pages, "
+          f"skipped {skipped_copies} unchanged HTML copies (manifest: {manifest_path})")
+    if converted:
+        print(f"Output files: {write_counts['new']} new, {write_counts['updated']} updated, "
+              f"{write_counts['unchanged']} unchanged (not rewritten)")
+    if copied:
+        print(f"HTML copies: {format_bytes(bytes_moved)} moved for {copied} files")
+    if converted:
+        print(f"Template load/compile time: {template_seconds * 1000:.1f} ms")
+    if minify and converted:
+        print(format_minify_report(*minify_bytes))
+    if critical_css and converted:
+        print(f"Critical CSS: inlined {format_bytes(critical_bytes)} in {critical_pages[0]} pages, "
+              f"{critical_pages[1]} pages kept their stylesheet links (none found or over "
+              f"{critical_css['max_inline_kb']:g} KB)")
+    for content_type, original_bytes, purged_bytes in purged:
+        print(f"Purged CSS ({content_type}): {format_bytes(original_bytes)} → {format_bytes(purged_bytes)} "
+              f"({purged_stylesheet_path(config, content_type)})")
+    if search_summary:
+        print(f"Search index: {search_summary['documents']} pages ({search.updated} re-indexed), "
+              f"{search_summary['terms']} terms in {search_summary['shards']} shards "
+              f"(largest {format_bytes(search_summary['largest_shard'])}), "
+              f"{search_summary['written']} files written, {search_summary['removed']} removed "
+              f"({search.output_dir})")
+    if sitemap_summary:
+        print(f"Sitemap and feed: {sitemap_summary['pages']} pages, {sitemap_summary['read']} frontmatters read, "
+              f"{sitemap_summary['changed']} new lastmod values (sitemap.xml {sitemap_summary['sitemap']}, "
+              f"feed.xml {sitemap_summary['feed']})")
+    if asset_manifest is not None:
+        print(f"Fingerprinted assets: {len(asset_manifest)} ({assets.manifest_file})")
+    if parse_cache and (cache_hits or cache_misses):
+        print(f"Parse cache: {cache_hits} hits, {cache_misses} misses, {evicted} entries evicted "
+              f"({parse_cache.cache_dir})")
+
+    if peak_memory:
+        mode = 'streamed' if stream_render else 'buffered'
+        print(f"\nPeak memory per page ({mode} rendering, largest first):")
+        for size, output_file in sorted(peak_memory, key=lambda item: item[0], reverse=True)[:10]:
+            print(f"  {format_bytes(size):>10}  {output_file}")
+
+    manifest['stats'] = {'converted': converted, 'copied': copied, 'writes': write_counts}
+    return manifest
+
+
+def get_watch_roots(config, config_file):
+    """Directories to watch: sources, templates, the CSS directories and the config file's directory"""
+    roots = {
+        Path(config['source']['root_dir']): True,
+        Path(config['source']['templates_dir']): True
+    }
+
+    # CSS directories, resolved from each content type's css_files as seen from its output folder
+    output_root = Path(config['output']['root_dir'])
+    for type_config in config.get('content_types', {}).values():
+        sample_output = output_root / type_config.get('output_subdir', '') / 'page.html'
+        for css_path in resolve_css_paths(type_config.get('css_files', []), sample_output):
+            roots.setdefault(css_path.parent, False)
+
+    roots.setdefault(Path(config_file).parent, False)
+    return sorted(roots.items())
+
+
+def run_watch(args, config_file='convert_config_generic.yml'):
+    """Watch mode: keep config, Jinja environment and manifest warm and rebuild affected pages"""
+    from watch import LiveReloadServer, watch
+
+    def load_state():
+        state['config'] = load_config(config_file)
+        state['jinja_env'] = setup_jinja_env(state['config'])
+        if state.get('executor'):
+            state['executor'].shutdown()
+        # A warm worker pool is kept across rebuilds when --jobs is used
+        state['executor'] = None
+        if args.jobs != 1:
+            state['executor'] = ProcessPoolExecutor(max_workers=args.jobs or None, initializer=_init_worker,
+                                                    initargs=(state['config'],))
+
+    state = {}
+    load_state()
+    previous_manifest = new_manifest('') if args.force else load_manifest(get_manifest_path(state['config']))
+    state['manifest'] = build_site(state['config'], state['jinja_env'], args, previous_manifest,
+                                   executor=state['executor'])
+
+    server = None
+    if args.serve is not None:
+        server = LiveReloadServer(state['config']['output']['root_dir'], port=args.serve)
+        server.start()
+
+    config_path = Path(config_file).resolve()
+
+    def is_relevant(path):
+        """Sources and templates anywhere below their roots; the config file, CSS and page images elsewhere"""
+        resolved = path.resolve()
+        if resolved == config_path:
+            return True
+        if any(path.as_posix() in entry.get('dependencies', []) for entry in state['manifest']['pages'].values()):
+            return True
+        for root, recursive in get_watch_roots(state['config'], config_file):
+            root = root.resolve()
+            if recursive and root in resolved.parents:
+                return True
+            if resolved.parent == root and resolved.suffix == '.css':
+                return True
+        return False
+
+    def on_change(paths):
+        start = time.perf_counter()
+        relevant = {Path(path) for path in paths if is_relevant(Path(path))}
+        if not relevant:
+            return
+
+        changed = relevant
+        if any(Path(path).resolve() == config_path for path in relevant):
+            # Config edits invalidate everything: reload it and rebuild the environment
+            print("Configuration changed, reloading")
+            load_state()
+            changed = None
+
+        print(f"\nChanged: {', '.join(sorted(str(path) for path in relevant))}")
+        state['manifest'] = build_site(state['config'], state['jinja_env'], args, state['manifest'],
+                                       changed=changed, executor=state['executor'], log_unchanged=False)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Rebuilt in {elapsed_ms:.1f} ms")
+
+        # Only reload the browser when a file in the output actually changed
+        stats = state['manifest']['stats']
+        if server and (stats['writes']['new'] or stats['writes']['updated'] or stats['copied']):
+            server.notify()
+
+    try:
+        watch(get_watch_roots(state['config'], config_file), on_change, debounce=args.debounce / 1000)
+    finally:
+        if state['executor']:
+            state['executor'].shutdown()
+
+
+def main(argv=None):
+    """Main conversion function"""
+    parser = argparse.ArgumentParser(description='Convert markdown files to HTML using Jinja2 templates')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild every page, ignoring the build manifest')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Convert pages in N worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream rendered pages to disk with template.generate() (see output.stream_render)')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Measure and report peak memory per rendered page')
+    add_profile_arguments(parser)
+    parser.add_argument('--compile-templates', action='store_true',
+                        help='Precompile all templates into jinja.compiled_templates_dir and exit')
+    parser.add_argument('--watch', action='store_true',
+                        help='Watch sources, templates and CSS and rebuild affected pages on change')
+    parser.add_argument('--serve', type=int, nargs='?', const=8000, metavar='PORT',
+                        help='With --watch: serve the output directory with live reload (default port: 8000)')
+    parser.add_argument('--debounce', type=float, default=30, metavar='MS',
+                        help='With --watch: wait this long for a burst of events to settle (default: 30)')
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        run_watch(args)
+        return
+
+    config = load_config()
+
+    if args.compile_templates:
+        compile_templates(config)
+        return
+
+    jinja_env = setup_jinja_env(config)
+
+    source_root = Path(config['source']['root_dir'])
+
+    if not source_root.exists():
+        print(f"Error: Source directory '{source_root}' not found")
+        return
+
+    # Load the previous build manifest
+    manifest_path = get_manifest_path(config)
+    previous_manifest = new_manifest('') if args.force else load_manifest(manifest_path)
+
+    profiler = open_profiler(args.profile)
+    build_site(config, jinja_env, args, previous_manifest, profiler=profiler)
+
+    # Post-build: .gz/.br sidecars for the outputs that changed
+    with profiler.span('precompress', category=BUILD):
+        summary = precompress_output(config)
+    if summary:
+        print('\n'.join(format_summary(summary)))
+
+    # Post-build: every local href/src must resolve to a file of the site
+    with profiler.span('link_check', category=BUILD):
+        run_link_check(config)
+
+    finish_profile(profiler, args.profile, args.profile_top)
 
 
 if __name__ == '__main__':
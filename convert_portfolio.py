@@ -5,18 +5,27 @@ Convert portfolio markdown files to HTML with the Stempy design system
 
 import os
 import re
-import yaml
+import argparse
 from pathlib import Path
 from datetime import datetime
 
+from build_manifest import hash_text
+from critical_css import critical_css_settings, inline_critical_css
+from generate_portfolio_index import create_portfolio_item, parse_frontmatter_text, write_portfolio_index
+from image_pipeline import open_image_pipeline, pillow_available
+from image_probe import add_image_hints, open_image_probe, resolve_source_image
+from output_files import new_write_counts, write_if_changed
+from profiler import BUILD, add_profile_arguments, finish_profile, open_profiler
+from search_index import html_to_text, make_search_document, open_search_index
+from yaml_loader import load_yaml_config
+
 def load_config(config_file='convert_config.yml'):
     """Load configuration from YAML file"""
     config_path = Path(config_file)
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_file}")
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return load_yaml_config(config_path)
 
 def format_filename_as_title(filename):
     """Convert a filename to a nicely formatted title"""
@@ -158,6 +167,21 @@ def fix_image_path(path, config):
     # Path in markdown already includes _pages/, just prepend base
     return f"{images_base}/{path}"
 
+def image_source_path(url, config):
+    """Source file on disk for an image URL produced by fix_image_path (None if not local)"""
+    prefix = f"{config['paths']['images_base']}/"
+    if not url or not url.startswith(prefix):
+        return None
+    return resolve_source_image(Path(config['source']['images_dir']).parent / url[len(prefix):])
+
+def resolve_image_file(src, config):
+    """Image file on disk for an emitted src: a source image or a generated derivative"""
+    source = image_source_path(src, config)
+    if source is None and src and not src.startswith(('/', '..')):
+        candidate = Path(config['output']['html_dir']) / src
+        source = candidate if candidate.is_file() else None
+    return source
+
 def extract_images_from_frontmatter(frontmatter, config):
     """Extract all image references from frontmatter"""
     images = {
@@ -287,7 +311,15 @@ def format_date(date_str):
     except:
         return date_str
 
-def create_gallery_html(gallery_images):
+def render_img(src, alt, kind, config, image_pipeline=None, attrs=''):
+    """<img> tag for an image, as a responsive <picture> when derivatives exist"""
+    if image_pipeline:
+        picture = image_pipeline.render_img(image_source_path(src, config), src, alt, kind, attrs)
+        if picture:
+            return picture
+    return f'<img src="{src}" alt="{alt}"{attrs}>'
+
+def create_gallery_html(gallery_images, config=None, image_pipeline=None):
     """Create HTML for image gallery"""
     if not gallery_images:
         return ''
@@ -297,10 +329,11 @@ def create_gallery_html(gallery_images):
         img_path = img['image_path']
         alt = img['alt']
         url = img.get('url', img_path)
+        img_html = render_img(img_path, alt, 'gallery', config, image_pipeline, ' loading="lazy"')
 
         gallery_items.append(f'''
             <a href="{url}" class="gallery-item">
-                <img src="{img_path}" alt="{alt}" loading="lazy">
+                {img_html}
             </a>
         ''')
 
@@ -319,7 +352,7 @@ def load_template(template_name, config):
     template_path = Path(templates_dir) / template_name
     return template_path.read_text(encoding='utf-8')
 
-def create_html(frontmatter, body_html, accent_color, images, config):
+def create_html(frontmatter, body_html, accent_color, images, config, image_pipeline=None, image_probe=None):
     """Create complete HTML page with images using template"""
     title = frontmatter.get('title', 'Portfolio Item')
     excerpt = frontmatter.get('excerpt', '')
@@ -364,12 +397,21 @@ def create_html(frontmatter, body_html, accent_color, images, config):
         img_src = images['teaser'] or images['sidebar_image']
         hero_image_html = f'''
             <div class="hero-image">
-                <img src="{img_src}" alt="{title}">
+                {render_img(img_src, title, 'hero', config, image_pipeline)}
             </div>
         '''
 
     # Create gallery
-    gallery_html = create_gallery_html(images['gallery'])
+    gallery_html = create_gallery_html(images['gallery'], config, image_pipeline)
+
+    # Intrinsic sizes and loading hints for every image (the hero is above the fold, so not lazy)
+    if image_probe:
+        def resolve(src):
+            return resolve_image_file(src, config)
+
+        body_html = add_image_hints(body_html, resolve, image_probe)
+        hero_image_html = add_image_hints(hero_image_html, resolve, image_probe, lazy=False)
+        gallery_html = add_image_hints(gallery_html, resolve, image_probe)
 
     # Load template and replace placeholders
     template = load_template(config['templates']['portfolio_item'], config)
@@ -385,10 +427,40 @@ def create_html(frontmatter, body_html, accent_color, images, config):
 
     return html
 
-def main():
-    """Main conversion function"""
+def build_image_derivatives(image_pipeline, pages, config):
+    """Generate the resized derivatives of the teaser, sidebar and gallery images of all pages"""
+    if not pillow_available():
+        print("Responsive images: Pillow is not installed, using the original images")
+        return
+
+    sources = set()
+    for _, _, _, images, _ in pages:
+        urls = [images['teaser'], images['sidebar_image']]
+        urls.extend(img['image_path'] for img in images['gallery'])
+        sources.update(source for source in (image_source_path(url, config) for url in urls) if source)
+
+    summary = image_pipeline.process(sources)
+    print(f"Responsive images: {summary['sources']} sources, {summary['generated']} derivatives generated, "
+          f"{summary['reused']} sources reused from cache, {summary['failed']} unreadable")
+    if summary['original_bytes']:
+        print(f"  Largest served variants: {summary['derivative_bytes'] / 1024:.1f} KB vs "
+              f"{summary['original_bytes'] / 1024:.1f} KB of originals "
+              f"({summary['derivative_bytes'] / summary['original_bytes']:.0%})")
+    print()
+
+def main(argv=None):
+    """Main conversion function
+
+    Single pass over the portfolio sources: each file is read and parsed once,
+    and the same parsed items produce both the detail pages and the index.
+    """
+    parser = argparse.ArgumentParser(description='Convert portfolio markdown files to HTML')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
     # Load configuration
     config = load_config()
+    profiler = open_profiler(args.profile)
 
     portfolio_dir = Path(config['source']['portfolio_dir'])
     output_dir = Path(config['output']['html_dir'])
@@ -406,14 +478,24 @@ def main():
     print(f"Found {len(md_files)} markdown files to convert")
     print(f"Output directory: {output_dir}")
 
-    for index, md_file in enumerate(md_files):
-        print(f"Converting: {md_file.name}")
+    # Index cards collected from the same parse as the detail pages
+    portfolio_items = []
+    pages = []
 
+    for md_file in md_files:
         # Read markdown file
-        content = md_file.read_text(encoding='utf-8')
+        with profiler.span('read', md_file):
+            content = md_file.read_text(encoding='utf-8')
 
         # Parse frontmatter and body
-        frontmatter, body = parse_frontmatter(content)
+        with profiler.span('frontmatter', md_file):
+            frontmatter, body = parse_frontmatter(content)
+
+        # The index card uses the index generator's own frontmatter parser, so the cards
+        # match generate_portfolio_index.py exactly (same text as read_frontmatter_text)
+        parts = content.split('---', 2) if content.startswith('---') else []
+        card_frontmatter = parse_frontmatter_text(parts[1]) if len(parts) == 3 else {}
+        portfolio_items.append(create_portfolio_item(md_file.stem, card_frontmatter))
 
         # Ensure there's always a title - fallback to formatted filename
         if 'title' not in frontmatter or not frontmatter['title']:
@@ -428,25 +510,83 @@ def main():
             1 if images['sidebar_image'] else 0,
             len(images['gallery'])
         ])
+        pages.append((md_file, frontmatter, body, images, img_count))
+
+    # Build responsive image derivatives for every page before rendering
+    image_pipeline = open_image_pipeline(config, output_dir)
+    if image_pipeline:
+        with profiler.span('image_derivatives', category=BUILD):
+            build_image_derivatives(image_pipeline, pages, config)
+
+    image_probe = open_image_probe(config)
+    write_counts = new_write_counts()
+    critical_css = critical_css_settings(config)
+    critical_pages = 0
+    search = open_search_index(config, writer='portfolio')
+
+    for index, (md_file, frontmatter, body, images, img_count) in enumerate(pages):
+        print(f"Converting: {md_file.name}")
         if img_count > 0:
             print(f"  Found {img_count} image(s)")
 
         # Convert markdown to HTML
-        body_html = markdown_to_html(body, config)
+        with profiler.span('markdown', md_file):
+            body_html = markdown_to_html(body, config)
 
         # Get accent color
         accent_color = get_accent_color(index)
 
         # Create HTML
-        html = create_html(frontmatter, body_html, accent_color, images, config)
+        with profiler.span('create_html', md_file):
+            html = create_html(frontmatter, body_html, accent_color, images, config, image_pipeline, image_probe)
 
         # Write HTML file to output directory
         html_file = output_dir / f"{md_file.stem}.html"
-        html_file.write_text(html, encoding='utf-8')
 
-        print(f"  → Created: {html_file}")
+        # Inline the CSS rules the page uses and load the stylesheets asynchronously
+        if critical_css:
+            with profiler.span('critical_css', md_file):
+                html, critical_bytes = inline_critical_css(html, html_file, critical_css['max_inline_kb'],
+                                                           critical_css['safelist'])
+            critical_pages += 1 if critical_bytes else 0
+
+        with profiler.span('write', md_file):
+            write_status = write_if_changed(html_file, html)
+        write_counts[write_status] += 1
+
+        print(f"  → Created: {html_file}" + (" (unchanged)" if write_status == 'unchanged' else ""))
+
+        # Title, excerpt and body text go into the shared search index (re-tokenized only when the page changed)
+        page_key = hash_text(html)
+        if search and not search.has_page(md_file.as_posix(), page_key):
+            with profiler.span('search_document', md_file):
+                search.update_page(md_file.as_posix(), page_key, make_search_document(
+                    search.page_url(html_file), frontmatter['title'], html_to_text(body_html), frontmatter))
+
+    if image_probe:
+        image_probe.save()
+
+    search_summary = None
+    if search:
+        with profiler.span('search_index', category=BUILD):
+            search_summary = search.write(md_file.as_posix() for md_file, *_ in pages)
 
     print(f"\nConversion complete! Created {len(md_files)} HTML files in {output_dir}/.")
+    print(f"Output files: {write_counts['new']} new, {write_counts['updated']} updated, "
+          f"{write_counts['unchanged']} unchanged (not rewritten)")
+    if critical_css:
+        print(f"Critical CSS: inlined in {critical_pages} of {len(pages)} pages "
+              f"(pages whose stylesheets are not found next to them keep their links)")
+    if search_summary:
+        print(f"Search index: {search.updated} portfolio pages re-indexed, {search_summary['documents']} pages "
+              f"in {search_summary['shards']} shards, {search_summary['written']} files written, "
+              f"{search_summary['removed']} removed ({search.output_dir})")
+
+    # Write the index from the items parsed above (no second read of the sources)
+    with profiler.span('portfolio_index', category=BUILD):
+        write_portfolio_index(portfolio_items, config)
+
+    finish_profile(profiler, args.profile, args.profile_top)
 
 if __name__ == '__main__':
     main()
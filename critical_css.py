@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Critical CSS inlining and unused-rule purging
+Finds the selectors a rendered page can match (from the tags, classes, ids and attributes
+it contains), inlines the rules of its local stylesheets that use them in <head>, and turns
+the stylesheet links into asynchronous loads. Optionally writes a purged stylesheet per
+content type with only the rules its pages use.
+"""
+
+import os
+import re
+from pathlib import Path
+
+from output_files import write_if_changed
+
+DEFAULT_MAX_INLINE_KB = 14
+
+# At-rules whose block holds nested rules (filtered like top-level rules)
+GROUP_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r'<([a-zA-Z][\w-]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>')
+ATTRIBUTE_PATTERN = re.compile(r'([^\s"\'=/>]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+LINK_TAG_PATTERN = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+HEAD_END_PATTERN = re.compile(r'</head\s*>', re.IGNORECASE)
+
+# Pseudo-classes/elements, which do not decide whether an element exists on the page
+PSEUDO_PATTERN = re.compile(r'::?[\w-]+(?:\([^)]*\))?')
+COMBINATOR_PATTERN = re.compile(r'\s*[>+~]\s*|\s+')
+TAG_NAME_PATTERN = re.compile(r'^([a-zA-Z][\w-]*)')
+CLASS_PATTERN = re.compile(r'\.([\w-]+)')
+ID_PATTERN = re.compile(r'#([\w-]+)')
+ATTRIBUTE_SELECTOR_PATTERN = re.compile(r'\[\s*([\w-]+)[^\]]*\]')
+KEYFRAMES_NAME_PATTERN = re.compile(r'@(?:-\w+-)?keyframes\s+([\w-]+)')
+
+# Parsed stylesheets per process, keyed by path and validated by mtime and size
+_stylesheets = {}
+
+
+class PageSelectors:
+    """Tag names, classes, ids and attribute names present in an HTML document"""
+
+    def __init__(self, safelist=()):
+        self.tags = {'html', 'body'}
+        self.classes = set(safelist)
+        self.ids = set()
+        self.attributes = set()
+
+    def add_html(self, html):
+        for match in HTML_TAG_PATTERN.finditer(html):
+            self.tags.add(match.group(1).lower())
+            for name, value in ATTRIBUTE_PATTERN.findall(match.group(2)):
+                name = name.lower()
+                self.attributes.add(name)
+                value = value.strip('"\'')
+                if name == 'class':
+                    self.classes.update(value.split())
+                elif name == 'id':
+                    self.ids.add(value)
+        return self
+
+    def _compound_matches(self, compound):
+        tag = TAG_NAME_PATTERN.match(compound)
+        if tag and tag.group(1).lower() not in self.tags:
+            return False
+        return (all(name in self.classes for name in CLASS_PATTERN.findall(compound))
+                and all(name in self.ids for name in ID_PATTERN.findall(compound))
+                and all(name.lower() in self.attributes for name in ATTRIBUTE_SELECTOR_PATTERN.findall(compound)))
+
+    def matches(self, selector):
+        """True unless a part of the selector names something the page does not contain
+
+        Pseudo-classes and the element relationships are ignored, so this errs on the
+        side of keeping rules.
+        """
+        if '\\' in selector:
+            return True  # escaped characters: not worth parsing, keep the rule
+        # Drop attribute values (which may contain spaces) and pseudo-classes before splitting
+        selector = PSEUDO_PATTERN.sub('', ATTRIBUTE_SELECTOR_PATTERN.sub(r'[\1]', selector))
+        return all(self._compound_matches(compound)
+                   for compound in COMBINATOR_PATTERN.split(selector.strip()) if compound)
+
+
+def _find_top_level(css, position, chars):
+    """Index of the next of chars outside strings and parentheses (len(css) if none)"""
+    depth = 0
+    quote = None
+    while position < len(css):
+        char = css[position]
+        if quote:
+            if char == '\\':
+                position += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and char in chars:
+            return position
+        position += 1
+    return position
+
+
+def _find_block_end(css, position):
+    """Index of the '}' closing the block that starts after position"""
+    depth = 1
+    while position < len(css):
+        position = _find_top_level(css, position, '{}')
+        if position >= len(css):
+            break
+        depth += 1 if css[position] == '{' else -1
+        if depth == 0:
+            return position
+        position += 1
+    return len(css)
+
+
+def parse_css(css):
+    """Parse a stylesheet into ('rule', selectors, body), ('group', prelude, children),
+    ('at', prelude, body) and ('statement', text) nodes"""
+    css = COMMENT_PATTERN.sub('', css)
+    nodes = []
+    position = 0
+    while True:
+        while position < len(css) and css[position].isspace():
+            position += 1
+        if position >= len(css):
+            return nodes
+        end = _find_top_level(css, position, '{;}')
+        if end >= len(css) or css[end] != '{':
+            text = css[position:end].strip()
+            if text:
+                nodes.append(('statement', text + ';'))
+            position = end + 1
+            continue
+
+        prelude = ' '.join(css[position:end].split())
+        block_end = _find_block_end(css, end + 1)
+        body = css[end + 1:block_end]
+        if prelude.lower().startswith(GROUP_AT_RULES):
+            nodes.append(('group', prelude, parse_css(body)))
+        elif prelude.startswith('@'):
+            nodes.append(('at', prelude, body))
+        else:
+            nodes.append(('rule', prelude, body))
+        position = block_end + 1
+
+
+def split_selectors(selectors):
+    parts = []
+    position = 0
+    while position <= len(selectors):
+        end = _find_top_level(selectors, position, ',')
+        parts.append(selectors[position:end].strip())
+        position = end + 1
+    return [part for part in parts if part]
+
+
+def compact_declarations(body):
+    """Collapse whitespace in a declaration block, keeping quoted strings as they are"""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', body)
+    for index in range(0, len(parts), 2):
+        text = ' '.join(parts[index].split())
+        parts[index] = re.sub(r'\s*([:;,{}])\s*', r'\1', text)
+    return ''.join(parts).strip().rstrip(';')
+
+
+def load_stylesheet(path):
+    """Parsed nodes of a stylesheet file (cached per process), or None if it cannot be read"""
+    key = str(path)
+    try:
+        stat = os.stat(path)
+        cached = _stylesheets.get(key)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        nodes = parse_css(Path(path).read_text(encoding='utf-8'))
+    except (OSError, UnicodeDecodeError):
+        return None
+    _stylesheets[key] = (stat.st_mtime_ns, stat.st_size, nodes)
+    return nodes
+
+
+def _used_rules(nodes, page):
+    """CSS text of the rules in nodes that the page can match"""
+    output = []
+    for node in nodes:
+        if node[0] == 'rule':
+            selectors = [selector for selector in split_selectors(node[1]) if page.matches(selector)]
+            if selectors:
+                output.append(f"{','.join(selectors)}{{{compact_declarations(node[2])}}}")
+        elif node[0] == 'group':
+            inner = _used_rules(node[2], page)
+            if inner:
+                output.append(f"{node[1]}{{{inner}}}")
+        elif node[0] == 'at':
+            output.append(node)
+        else:
+            output.append(node[1])
+
+    text = ''.join(part for part in output if isinstance(part, str))
+    # Keep @font-face and friends; keep @keyframes only when a kept rule uses the animation
+    for index, part in enumerate(output):
+        if isinstance(part, tuple):
+            name = KEYFRAMES_NAME_PATTERN.match(part[1])
+            if name and not re.search(rf'\b{re.escape(name.group(1))}\b', text):
+                output[index] = ''
+            else:
+                output[index] = f"{part[1]}{{{' '.join(part[2].split())}}}"
+    return ''.join(output)
+
+
+def used_css(css_paths, page):
+    """The rules of the given stylesheets that the page can match, in stylesheet order"""
+    parts = []
+    for css_path in css_paths:
+        nodes = load_stylesheet(css_path)
+        if nodes:
+            parts.append(_used_rules(nodes, page))
+    return ''.join(parts)
+
+
+def _link_attributes(tag):
+    return {name.lower(): value.strip('"\'') for name, value in ATTRIBUTE_PATTERN.findall(tag[5:-1])}
+
+
+def local_stylesheet_links(html, output_file):
+    """(match, href, path) of the stylesheets in a page's <head> that exist on disk"""
+    links = []
+    head_end = HEAD_END_PATTERN.search(html)
+    for match in LINK_TAG_PATTERN.finditer(html, 0, head_end.start() if head_end else len(html)):
+        attributes = _link_attributes(match.group(0))
+        href = attributes.get('href', '')
+        if attributes.get('rel', '').lower() != 'stylesheet' or not href \
+                or href.startswith(('http:', 'https:', '//', 'data:')) or attributes.get('media'):
+            continue
+        path = Path(os.path.normpath(Path(output_file).parent / href.split('?', 1)[0].split('#', 1)[0]))
+        if path.is_file():
+            links.append((match, href, path))
+    return links
+
+
+def async_stylesheet_link(href):
+    """Non-render-blocking stylesheet link, with a plain link for browsers without JavaScript"""
+    return (f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+
+def inline_critical_css(html, output_file, max_inline_kb=DEFAULT_MAX_INLINE_KB, safelist=(), async_href=None):
+    """Inline the rules a page uses and load its local stylesheets asynchronously
+
+    Returns (html, inlined bytes); pages without local stylesheets, or whose used rules
+    exceed max_inline_kb, are returned unchanged with 0. With async_href (a purged
+    stylesheet), that single file is loaded instead of the original stylesheets.
+    """
+    links = local_stylesheet_links(html, output_file)
+    if not links:
+        return html, 0
+
+    page = PageSelectors(safelist).add_html(html)
+    critical = used_css([path for _, _, path in links], page)
+    if len(critical.encode('utf-8')) > max_inline_kb * 1024:
+        return html, 0
+
+    # The inlined rules take the place of the first link so the cascade order is unchanged
+    deferred = [async_href] if async_href else [href for _, href, _ in links]
+    parts = [html[:links[0][0].start()], f'<style>{critical}</style>']
+    parts.extend(async_stylesheet_link(href) for href in deferred)
+    for (match, _, _), next_link in zip(links, links[1:] + [None]):
+        parts.append(html[match.end():next_link[0].start() if next_link else len(html)])
+    return ''.join(parts), len(critical.encode('utf-8'))
+
+
+def write_purged_stylesheet(css_paths, html_files, output_file, safelist=()):
+    """Write the rules of css_paths that any of html_files can match to output_file
+
+    Returns (original bytes, purged bytes).
+    """
+    page = PageSelectors(safelist)
+    for html_file in html_files:
+        try:
+            page.add_html(Path(html_file).read_text(encoding='utf-8'))
+        except OSError:
+            continue
+    purged = used_css(css_paths, page)
+    write_if_changed(output_file, purged + '\n')
+    original_bytes = sum(Path(css_path).stat().st_size for css_path in css_paths if Path(css_path).is_file())
+    return original_bytes, len(purged.encode('utf-8')) + 1
+
+
+def purged_stylesheet_path(config, content_type):
+    """Output path of the purged stylesheet of a content type"""
+    return Path(config['output']['root_dir']) / 'css' / f'{content_type}.purged.css'
+
+
+def critical_css_settings(config):
+    """The `critical_css` config section, or None when the stage is disabled"""
+    settings = config.get('critical_css') or {}
+    if not settings.get('enabled', False):
+        return None
+    return {'max_inline_kb': float(settings.get('max_inline_kb', DEFAULT_MAX_INLINE_KB)),
+            'safelist': list(settings.get('safelist') or []),
+            'purge': bool(settings.get('purge', False))}
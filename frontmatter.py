@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Header-only frontmatter scanning
+Reads a markdown file only up to its closing --- delimiter, in bounded chunks, so
+index and listing builders get the metadata without loading the body
+"""
+
+from yaml_loader import YAMLError, safe_load
+
+DEFAULT_CHUNK_SIZE = 4096
+DELIMITER = '---'
+
+
+def read_frontmatter_text(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return the raw text between the opening and closing --- delimiters
+
+    Matches content.split('---', 2)[1] for files that start with '---', but
+    stops reading as soon as the closing delimiter has been seen. Returns None
+    when the file has no frontmatter or the closing delimiter is missing.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(max(chunk_size, len(DELIMITER)))
+        if not buffer.startswith(DELIMITER):
+            return None
+
+        # Search only the new data (plus overlap for a delimiter split across chunks)
+        search_from = len(DELIMITER)
+        while True:
+            end = buffer.find(DELIMITER, search_from)
+            if end != -1:
+                return buffer[len(DELIMITER):end]
+
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return None
+            search_from = max(len(DELIMITER), len(buffer) - len(DELIMITER) + 1)
+            buffer += chunk
+
+
+def read_heading_title(file_path):
+    """Text of the body's first '# ' heading, or None
+
+    The title parse_frontmatter() falls back to when the frontmatter has none.
+    Reads the whole file, so call it only for sources without a title.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content.startswith(DELIMITER):
+        parts = content.split(DELIMITER, 2)
+        content = parts[2].strip() if len(parts) == 3 else ''
+    for line in content.split('\n'):
+        if line.startswith('# '):
+            return line[2:].strip()
+    return None
+
+
+def parse_yaml_frontmatter(frontmatter_text):
+    """Parse frontmatter text as YAML, returning {} for empty or invalid YAML"""
+    try:
+        frontmatter = safe_load(frontmatter_text.strip())
+    except YAMLError:
+        return {}
+    return frontmatter if isinstance(frontmatter, dict) else {}
+
+
+def scan_frontmatter(file_path, parse=parse_yaml_frontmatter, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return the parsed frontmatter of a file without reading its body ({} if there is none)"""
+    frontmatter_text = read_frontmatter_text(file_path, chunk_size)
+    if frontmatter_text is None:
+        return {}
+    return parse(frontmatter_text)
@@ -4,18 +4,20 @@ Generate portfolio index.html with all portfolio items sorted by date
 """
 
 import re
-import yaml
 from pathlib import Path
 from datetime import datetime
 
+from frontmatter import scan_frontmatter
+from output_files import write_if_changed
+from yaml_loader import load_yaml_config
+
 def load_config(config_file='convert_config.yml'):
     """Load configuration from YAML file"""
     config_path = Path(config_file)
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_file}")
 
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return load_yaml_config(config_path)
 
 def parse_frontmatter(content):
     """Extract YAML frontmatter from markdown content"""
@@ -26,7 +28,11 @@ def parse_frontmatter(content):
     if len(parts) < 3:
         return {}, content
 
-    frontmatter_text = parts[1].strip()
+    return parse_frontmatter_text(parts[1]), ""
+
+def parse_frontmatter_text(frontmatter_text):
+    """Parse the text between the --- delimiters into a dict"""
+    frontmatter_text = frontmatter_text.strip()
     frontmatter = {}
     current_key = None
     current_list = None
@@ -58,7 +64,7 @@ def parse_frontmatter(content):
 
             current_key = key
 
-    return frontmatter, ""
+    return frontmatter
 
 def get_accent_color(index):
     """Get accent color based on index"""
@@ -86,43 +92,21 @@ def load_template(template_name, config):
     template_path = Path(templates_dir) / template_name
     return template_path.read_text(encoding='utf-8')
 
-def create_portfolio_index():
-    """Generate portfolio index.html"""
-    # Load configuration
-    config = load_config()
-
-    portfolio_dir = Path(config['source']['portfolio_dir'])
-    output_dir = Path(config['output']['html_dir'])
-
-    if not portfolio_dir.exists():
-        print(f"Error: {portfolio_dir} directory not found")
-        return
-
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Get all markdown files
-    md_files = sorted(portfolio_dir.glob('*.md'))
-
-    # Parse all portfolio items
-    portfolio_items = []
-
-    for md_file in md_files:
-        content = md_file.read_text(encoding='utf-8')
-        frontmatter, _ = parse_frontmatter(content)
-
-        item = {
-            'filename': md_file.stem,
-            'title': frontmatter.get('title', 'Untitled'),
-            'date': frontmatter.get('date', ''),
-            'excerpt': frontmatter.get('excerpt', ''),
-            'tags': frontmatter.get('tags', []),
-            'sort_date': parse_date_for_sorting(frontmatter.get('date', ''))
-        }
-        portfolio_items.append(item)
-
+def create_portfolio_item(filename, frontmatter):
+    """Build the card data for one portfolio item from its parsed frontmatter"""
+    return {
+        'filename': filename,
+        'title': frontmatter.get('title', 'Untitled'),
+        'date': frontmatter.get('date', ''),
+        'excerpt': frontmatter.get('excerpt', ''),
+        'tags': frontmatter.get('tags', []),
+        'sort_date': parse_date_for_sorting(frontmatter.get('date', ''))
+    }
+
+def render_portfolio_index(portfolio_items, config):
+    """Render the portfolio index HTML from parsed portfolio items"""
     # Sort by date descending (newest first)
-    portfolio_items.sort(key=lambda x: x['sort_date'], reverse=True)
+    portfolio_items = sorted(portfolio_items, key=lambda x: x['sort_date'], reverse=True)
 
     # Load card template
     card_template = load_template(config['templates']['portfolio_card'], config)
@@ -156,12 +140,46 @@ def create_portfolio_index():
     html = template.replace('{{project_count}}', str(len(portfolio_items)))
     html = html.replace('{{portfolio_cards}}', '\n                    '.join(cards_html))
 
+    return html
+
+def write_portfolio_index(portfolio_items, config):
+    """Write index.html for already parsed portfolio items to the output directory"""
+    output_dir = Path(config['output']['html_dir'])
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    html = render_portfolio_index(portfolio_items, config)
+
     # Write index.html to output directory
     index_path = output_dir / 'index.html'
-    index_path.write_text(html, encoding='utf-8')
+    write_if_changed(index_path, html)
 
     print(f"✓ Generated {index_path} with {len(portfolio_items)} items")
     print(f"  Sorted by date (newest first)")
 
+    return index_path
+
+def create_portfolio_index():
+    """Generate portfolio index.html"""
+    # Load configuration
+    config = load_config()
+
+    portfolio_dir = Path(config['source']['portfolio_dir'])
+
+    if not portfolio_dir.exists():
+        print(f"Error: {portfolio_dir} directory not found")
+        return
+
+    # Get all markdown files
+    md_files = sorted(portfolio_dir.glob('*.md'))
+
+    # Parse all portfolio items (only the frontmatter header of each file is read)
+    portfolio_items = []
+
+    for md_file in md_files:
+        frontmatter = scan_frontmatter(md_file, parse=parse_frontmatter_text)
+        portfolio_items.append(create_portfolio_item(md_file.stem, frontmatter))
+
+    write_portfolio_index(portfolio_items, config)
+
 if __name__ == '__main__':
     create_portfolio_index()
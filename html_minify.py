@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Safe HTML minification for rendered pages
+Removes comments and indentation and collapses whitespace runs without changing how a page
+renders: every run keeps one whitespace character (a newline if it had one, so line numbers
+in reports stay meaningful), and the content of <pre>, <code>, <textarea>, <script> and
+<style> elements is left exactly as it is
+"""
+
+import re
+
+from build_manifest import hash_text
+from parse_cache import make_cache_key
+
+# Bump when the minifier output changes so cached results are not reused
+MINIFY_VERSION = 2
+
+# Elements whose content is whitespace-sensitive or not HTML at all
+PRESERVED_PATTERN = re.compile(r'<(pre|code|textarea|script|style)\b[^>]*>.*?</\1\s*>',
+                               re.IGNORECASE | re.DOTALL)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# A comment, or a start or end tag whose quoted attribute values may contain '>' or '<!--'.
+# Scanning both in one pass means only comments in text between tags are seen as comments.
+TOKEN_PATTERN = re.compile(r'(<!--.*?-->)|<(?:"[^"]*"|\'[^\']*\'|[^\'">])*>', re.DOTALL)
+
+# Inside a tag: a quoted attribute value (kept as is) or whitespace between attributes
+TAG_WHITESPACE_PATTERN = re.compile(r'("[^"]*"|\'[^\']*\')|\s+')
+
+# Whitespace around these tags is never rendered, so it is removed entirely
+INVISIBLE_TAG_PATTERN = re.compile(
+    r'\s*(<(?:!doctype|/?html|/?head|/?body|meta|link|/?title|base)\b[^>]*>)\s*', re.IGNORECASE)
+
+
+def _collapse(match):
+    return '\n' if '\n' in match.group(0) else ' '
+
+
+def _collapse_tag(match):
+    return match.group(1) or ' '
+
+
+def _minify_markup(markup):
+    parts = []
+    text = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(markup):
+        text.append(markup[position:match.start()])
+        position = match.end()
+        comment = match.group(1)
+        if comment and not comment.startswith('<!--[if'):
+            # Dropped; the text on both sides collapses as one run
+            continue
+        parts.append(WHITESPACE_PATTERN.sub(_collapse, ''.join(text)))
+        text = []
+        # Conditional comments (<!--[if IE]>) are interpreted by old browsers and kept as is
+        parts.append(comment or TAG_WHITESPACE_PATTERN.sub(_collapse_tag, match.group(0)))
+    text.append(markup[position:])
+    parts.append(WHITESPACE_PATTERN.sub(_collapse, ''.join(text)))
+    return INVISIBLE_TAG_PATTERN.sub(r'\1', ''.join(parts))
+
+
+def minify_html(html):
+    """Return html with comments and redundant whitespace removed
+
+    Attribute values are left untouched, even when they look like comments:
+
+    >>> minify_html('<p>a <!-- note -->  b</p>\\n<a title="<!-- c -->"  href="x">y</a>')
+    '<p>a b</p>\\n<a title="<!-- c -->" href="x">y</a>\\n'
+    """
+    parts = []
+    position = 0
+    for match in PRESERVED_PATTERN.finditer(html):
+        parts.append(_minify_markup(html[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_minify_markup(html[position:]))
+    return ''.join(parts).strip() + '\n'
+
+
+def minify_cached(html, parse_cache=None):
+    """minify_html() with results cached on disk by content hash (when a cache is given)"""
+    if not parse_cache:
+        return minify_html(html)
+    return parse_cache.get_or_compute('minify', make_cache_key(hash_text(html), MINIFY_VERSION),
+                                      lambda: minify_html(html))
+
+
+def format_minify_report(before_bytes, after_bytes):
+    saved = before_bytes - after_bytes
+    share = saved / before_bytes if before_bytes else 0
+    return (f"Minified HTML: {before_bytes:,} → {after_bytes:,} bytes "
+            f"({saved:,} bytes, {share:.1%} smaller)")
+
+
+def minify_enabled(config):
+    """True when the `minify` config section turns the stage on"""
+    return bool((config.get('minify') or {}).get('enabled', False))
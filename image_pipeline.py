@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Responsive image derivatives
+Resizes source images to the configured widths and formats in parallel, caches the
+results by source hash and renders <picture>/srcset markup for them.
+Pillow is optional: without it (or for unreadable files) the original images are used.
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from build_manifest import compute_build_key, hash_file
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+# Bump when the resizing or encoding changes so existing derivatives are regenerated
+PIPELINE_VERSION = 1
+
+DEFAULT_WIDTHS = [480, 960, 1600]
+DEFAULT_FORMATS = ['avif', 'webp', 'jpeg']
+DEFAULT_QUALITY = 75
+DEFAULT_STATE_FILE = '.cache/images/state.json'
+
+FORMAT_EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+# Formats every browser can display, used for the <img> fallback
+FALLBACK_FORMATS = ('jpeg', 'png')
+
+
+def pillow_available():
+    return Image is not None
+
+
+def supported_formats(formats):
+    """The configured formats this Pillow build can encode (jpeg/png always can)"""
+    supported = []
+    for fmt in formats:
+        if fmt in FALLBACK_FORMATS or (fmt in FORMAT_EXTENSIONS and features.check(fmt)):
+            supported.append(fmt)
+    return supported
+
+
+def target_widths(widths, original_width):
+    """Configured widths below the original, plus the original width when it is smaller
+    than the largest configured width and not within 10% of a narrower variant"""
+    targets = sorted(width for width in set(widths) if width < original_width)
+    if original_width <= max(widths) and (not targets or original_width > targets[-1] * 1.1):
+        targets.append(original_width)
+    return targets or [original_width]
+
+
+def _save_atomic(image, output_file, fmt, quality):
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            options = {'optimize': True} if fmt in FALLBACK_FORMATS else {}
+            image.save(f, format=fmt.upper(), quality=quality, **options)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def generate_derivatives(task):
+    """Resize one source image to every target width and format (runs in worker processes)
+
+    Returns the image info stored in the state file: original size and, per format,
+    a list of [width, filename, bytes] entries.
+    """
+    source = Path(task['source'])
+    output_dir = Path(task['output_dir'])
+    try:
+        with Image.open(source) as image:
+            image.load()
+            original_width, original_height = image.size
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+            formats = []
+            for fmt in task['formats']:
+                if fmt in FALLBACK_FORMATS:
+                    # JPEG has no alpha channel, so transparent images fall back to PNG
+                    fmt = 'png' if has_alpha else 'jpeg'
+                if fmt not in formats:
+                    formats.append(fmt)
+
+            output_dir.mkdir(parents=True, exist_ok=True)
+            variants = {fmt: [] for fmt in formats}
+            generated = 0
+            for width in target_widths(task['widths'], original_width):
+                height = max(1, round(original_height * width / original_width))
+                resized = image if width == original_width else image.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    name = f"{source.stem}-{task['key'][:10]}-{width}w.{FORMAT_EXTENSIONS[fmt]}"
+                    output_file = output_dir / name
+                    if not output_file.exists():
+                        _save_atomic(resized, output_file, fmt, task['quality'])
+                        generated += 1
+                    variants[fmt].append([width, name, output_file.stat().st_size])
+    except (OSError, ValueError, SyntaxError) as e:
+        # Unreadable or unsupported file (e.g. an un-fetched Git LFS pointer)
+        return {'error': str(e)}
+
+    return {'width': original_width, 'height': original_height, 'variants': variants,
+            'generated': generated}
+
+
+class ImagePipeline:
+    """Builds and remembers the derivatives of a set of source images"""
+
+    def __init__(self, settings, output_dir):
+        self.output_dir = Path(output_dir)
+        self.url_base = settings.get('output_subdir', 'images')
+        self.widths = [int(width) for width in settings.get('widths', DEFAULT_WIDTHS)]
+        self.quality = int(settings.get('quality', DEFAULT_QUALITY))
+        self.formats = supported_formats(settings.get('formats', DEFAULT_FORMATS)) if Image else []
+        self.jobs = settings.get('jobs', 0) or None
+        self.sizes = settings.get('sizes', {})
+        self.state_file = Path(settings.get('state_file', DEFAULT_STATE_FILE))
+        self.state = self._load_state()
+        self.images = {}
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.state, indent=2, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.state_file)
+
+    def _derivatives_exist(self, info):
+        return all((self.output_dir / name).exists()
+                   for entries in info.get('variants', {}).values() for _, name, _ in entries)
+
+    def process(self, sources):
+        """Generate missing derivatives for the given source files; returns a summary dict"""
+        summary = {'sources': 0, 'generated': 0, 'reused': 0, 'failed': 0,
+                   'original_bytes': 0, 'derivative_bytes': 0}
+        if not Image or not self.formats:
+            return summary
+
+        tasks = []
+        for source in sorted({str(source) for source in sources}):
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            summary['sources'] += 1
+
+            previous = self.state.get(source, {})
+            if (previous.get('mtime_ns'), previous.get('size')) == (stat.st_mtime_ns, stat.st_size):
+                source_hash = previous['hash']
+            else:
+                source_hash = hash_file(source)
+            key = compute_build_key(PIPELINE_VERSION, source_hash, self.widths, self.formats, self.quality)
+
+            entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'hash': source_hash, 'key': key}
+            info = previous.get('info')
+            if previous.get('key') == key and info and ('error' in info or self._derivatives_exist(info)):
+                entry['info'] = info
+                self.state[source] = entry
+                summary['reused'] += 1
+                continue
+
+            self.state[source] = entry
+            tasks.append({'source': source, 'output_dir': str(self.output_dir), 'key': key,
+                          'widths': self.widths, 'formats': self.formats, 'quality': self.quality})
+
+        if len(tasks) > 1 and self.jobs != 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(executor.map(generate_derivatives, tasks))
+        else:
+            results = [generate_derivatives(task) for task in tasks]
+
+        for task, info in zip(tasks, results):
+            self.state[task['source']]['info'] = info
+            summary['generated'] += info.get('generated', 0)
+
+        for source in sorted({str(source) for source in sources}):
+            info = self.state.get(source, {}).get('info')
+            if not info:
+                continue
+            if 'error' in info:
+                summary['failed'] += 1
+                continue
+            self.images[source] = info
+            # Largest variant of the preferred format: the most a browser downloads
+            preferred = next(iter(info['variants'].values()))
+            summary['original_bytes'] += self.state[source]['size']
+            summary['derivative_bytes'] += preferred[-1][2]
+
+        self._save_state()
+        return summary
+
+    def render_img(self, source, src, alt, kind, attrs=''):
+        """<picture> markup for a processed image, or None when it has no derivatives"""
+        info = self.images.get(str(source)) if source else None
+        if not info:
+            return None
+
+        sizes = self.sizes.get(kind, '100vw')
+        sources = []
+        fallback = None
+        for fmt, entries in info['variants'].items():
+            srcset = ', '.join(f'{self.url_base}/{name} {width}w' for width, name, _ in entries)
+            if fmt in FALLBACK_FORMATS:
+                fallback = (entries, srcset)
+            else:
+                sources.append(f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset}" sizes="{sizes}">')
+
+        if fallback:
+            entries, srcset = fallback
+            img = (f'<img src="{self.url_base}/{entries[-1][1]}" srcset="{srcset}" sizes="{sizes}" '
+                   f'alt="{alt}"{attrs}>')
+        else:
+            img = f'<img src="{src}" alt="{alt}"{attrs}>'
+        return f'<picture>{"".join(sources)}{img}</picture>'
+
+
+def open_image_pipeline(config, output_dir):
+    """Create the pipeline described by the `images` config section, or None when disabled"""
+    settings = config.get('images') or {}
+    if not settings.get('enabled', False):
+        return None
+    return ImagePipeline(settings, Path(output_dir) / settings.get('output_subdir', 'images'))
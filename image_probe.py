@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Image dimension probing and <img> loading hints
+Reads only the header bytes of PNG, JPEG, GIF and WebP files to find their intrinsic
+size (cached by path and mtime), then adds width/height, loading and decoding
+attributes, and optionally a tiny blurred placeholder, to emitted <img> tags
+"""
+
+import base64
+import io
+import json
+import os
+import re
+import struct
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageFilter, ImageOps
+except ImportError:
+    Image = None
+
+DEFAULT_PROBE_CACHE = '.cache/images/probe.json'
+
+# Width of the generated placeholder; the browser scales it up, which blurs it further
+PLACEHOLDER_WIDTH = 16
+
+IMG_TAG_PATTERN = re.compile(r'<img\b([^>]*?)(\s*/?)>', re.IGNORECASE)
+SRC_PATTERN = re.compile(r'\bsrc="([^"]*)"', re.IGNORECASE)
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, arithmetic), which carry the size
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# EXIF orientations that rotate the image by 90 degrees (browsers apply them when displaying)
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def resolve_source_image(path):
+    """Find an image on disk, ignoring case differences in the path
+
+    The portfolio frontmatter was written for a case-insensitive server
+    (e.g. _pages/xforce/ for _pages/XForce/).
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+
+    resolved = Path(path.parts[0]) if path.parts else path
+    for part in path.parts[1:]:
+        candidate = resolved / part
+        if not candidate.exists():
+            try:
+                matches = [entry for entry in os.listdir(resolved) if entry.lower() == part.lower()]
+            except OSError:
+                return None
+            if not matches:
+                return None
+            candidate = resolved / matches[0]
+        resolved = candidate
+    return resolved
+
+
+def _exif_orientation(segment):
+    """Orientation tag from the payload of a JPEG APP1 segment (1 when absent)"""
+    if not segment.startswith(b'Exif\0\0') or len(segment) < 14:
+        return 1
+    tiff = segment[6:]
+    endian = '<' if tiff[:2] == b'II' else '>'
+    try:
+        ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+        count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+        for index in range(count):
+            entry = ifd_offset + 2 + index * 12
+            tag, _, _, value = struct.unpack(endian + 'HHIH', tiff[entry:entry + 10])
+            if tag == 0x0112:
+                return value
+    except struct.error:
+        pass
+    return 1
+
+
+def _probe_jpeg(f):
+    f.seek(2)
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue  # markers without a length field
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            if orientation in ROTATED_ORIENTATIONS:
+                width, height = height, width
+            return width, height
+        if marker == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _probe_webp(header):
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(header) >= 30:
+        return int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+    return None
+
+
+def probe_image_size(path):
+    """Return (width, height) from the file header, or None for unknown or unreadable files"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(32)
+            if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+                return struct.unpack('>II', header[16:24])
+            if header[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', header[6:10])
+            if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+                return _probe_webp(header)
+            if header[:2] == b'\xff\xd8':
+                return _probe_jpeg(f)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def make_placeholder(path):
+    """Tiny blurred JPEG data URI for an opaque image (None without Pillow or for transparent images)"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            image.draft('RGB', (PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+            if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+                return None
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            image.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH * 4))
+            image = image.filter(ImageFilter.GaussianBlur(1))
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=40)
+    except (OSError, ValueError, SyntaxError):
+        return None
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class ImageProbe:
+    """Image sizes (and placeholders) cached on disk by path, mtime and size"""
+
+    def __init__(self, cache_file=DEFAULT_PROBE_CACHE, placeholders=False):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.placeholders = placeholders
+        self.entries = self._load()
+        self.new_entries = {}
+
+    def _load(self):
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, path):
+        """{'width', 'height'[, 'placeholder']} for an image file, or None when it cannot be probed"""
+        key = str(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        entry = self.entries.get(key)
+        stale = not entry or (entry['mtime_ns'], entry['size']) != (stat.st_mtime_ns, stat.st_size)
+        if stale or (self.placeholders and entry['width'] and 'placeholder' not in entry):
+            if stale:
+                size = probe_image_size(path)
+                entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                         'width': size[0] if size else None, 'height': size[1] if size else None}
+            else:
+                entry = dict(entry)
+            if self.placeholders and entry['width']:
+                entry['placeholder'] = make_placeholder(path)
+            self.entries[key] = entry
+            self.new_entries[key] = entry
+
+        return entry if entry['width'] else None
+
+    def take_new_entries(self):
+        """Entries probed since the last call (worker processes hand these to the parent)"""
+        entries, self.new_entries = self.new_entries, {}
+        return entries
+
+    def update(self, entries):
+        self.entries.update(entries)
+        self.new_entries.update(entries)
+
+    def save(self):
+        """Merge new entries into the cache file (atomically); no-op when nothing was probed"""
+        if not self.cache_file or not self.new_entries:
+            return
+        entries = self._load()
+        entries.update(self.new_entries)
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_file.with_suffix(f'.tmp-{os.getpid()}')
+        tmp_path.write_text(json.dumps(entries, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.cache_file)
+        self.new_entries = {}
+
+
+def add_image_hints(html, resolve, probe, lazy=True):
+    """Add width/height, loading and decoding attributes to the <img> tags in html
+
+    resolve(src) maps an src attribute to the image file on disk (or None). Tags
+    whose image cannot be probed only get the loading hints; attributes already
+    present are left alone. With lazy=False (above-the-fold images) loading is
+    not deferred.
+    """
+    if '<img' not in html:
+        return html
+
+    def annotate(match):
+        attrs = match.group(1)
+        lower = attrs.lower()
+        extra = []
+
+        src = SRC_PATTERN.search(attrs)
+        path = resolve(src.group(1)) if src else None
+        info = probe.get(path) if path and probe else None
+        if info and 'width=' not in lower and 'height=' not in lower:
+            extra.append(f'width="{info["width"]}" height="{info["height"]}"')
+            if info.get('placeholder') and 'style=' not in lower:
+                extra.append(f'style="background:url({info["placeholder"]}) center/cover no-repeat"')
+        if lazy and 'loading=' not in lower:
+            extra.append('loading="lazy"')
+        if 'decoding=' not in lower:
+            extra.append('decoding="async"')
+
+        if not extra:
+            return match.group(0)
+        return f'<img{attrs} {" ".join(extra)}{match.group(2)}>'
+
+    return IMG_TAG_PATTERN.sub(annotate, html)
+
+
+def relative_image_resolver(*base_dirs):
+    """resolve() for add_image_hints: relative srcs are looked up under each base directory in turn"""
+    def resolve(src):
+        if not src or src.startswith(('data:', 'http:', 'https:', '//')):
+            return None
+        src = src.split('#', 1)[0].split('?', 1)[0]
+        for base_dir in base_dirs:
+            path = resolve_source_image(os.path.normpath(Path(base_dir) / src.lstrip('/')))
+            if path and path.is_file():
+                return path
+        return None
+    return resolve
+
+
+def open_image_probe(config):
+    """Create the probe described by the `images` config section, or None when hints are disabled"""
+    settings = config.get('images') or {}
+    if not settings.get('hints', True):
+        return None
+    return ImageProbe(settings.get('probe_cache', DEFAULT_PROBE_CACHE),
+                      placeholders=settings.get('placeholders', False))
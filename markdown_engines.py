@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Pluggable Markdown engines
+The built-in converters and optional third-party libraries behind one interface,
+selected with markdown.engine in convert_config_generic.yml
+"""
+
+import re
+
+DEFAULT_ENGINE = 'builtin'
+
+# Inline patterns used by the markdown tokenizer (compiled once)
+JEKYLL_TAG_PATTERN = re.compile(r'\{%.*?%\}')
+IMAGE_PATTERN = re.compile(r'!\[(.*?)\]\((.*?)\)')
+BOLD_ITALIC_PATTERN = re.compile(r'\*\*\*(.*?)\*\*\*')
+BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+ITALIC_PATTERN = re.compile(r'\*(.*?)\*')
+LINK_PATTERN = re.compile(r'\[(.*?)\]\((.*?)\)')
+HR_PATTERN = re.compile(r'---+')
+HEADINGS = (('#### ', '<h4>', '</h4>'), ('### ', '<h3>', '</h3>'),
+            ('## ', '<h2>', '</h2>'), ('# ', '<h1>', '</h1>'))
+
+# name -> render(text, config, rel_depth) callable, or a factory for optional engines
+_engines = {}
+_engine_factories = {}
+
+
+def render_image_tag(alt, src, rel_depth):
+    """Build the <img> tag for a markdown image, fixing absolute paths for the output depth"""
+    if src.startswith('/'):
+        src = '../' * rel_depth + src[1:]
+    return f'<img src="{src}" alt="{alt}" class="content-image">'
+
+
+def prepare_source(text, rel_depth):
+    """Apply the project-specific rewrites before handing text to a third-party engine
+
+    Jekyll {% %} tags are stripped and images are turned into the same <img> tags
+    the built-in engine emits, so every engine shares the rel_depth path rewriting.
+    """
+    text = JEKYLL_TAG_PATTERN.sub('', text)
+    return IMAGE_PATTERN.sub(lambda m: render_image_tag(m.group(1), m.group(2), rel_depth), text)
+
+
+def register_engine(name, render):
+    """Register a render(text, config, rel_depth) callable under a name"""
+    _engines[name] = render
+
+
+def register_engine_factory(name, factory):
+    """Register a lazily constructed engine (used for optional dependencies)"""
+    _engine_factories[name] = factory
+
+
+def available_engines():
+    """Names of every registered engine, built-in or optional"""
+    return sorted(set(_engines) | set(_engine_factories))
+
+
+def get_markdown_engine(name=None):
+    """Return the render callable for an engine, constructing optional engines on first use"""
+    name = name or DEFAULT_ENGINE
+    if name not in _engines:
+        factory = _engine_factories.get(name)
+        if factory is None:
+            raise ValueError(f"Unknown markdown engine: {name} (available: {', '.join(available_engines())})")
+        _engines[name] = factory()
+    return _engines[name]
+
+
+def get_configured_engine_name(config):
+    """Read the engine name from the markdown section of the configuration"""
+    return (config.get('markdown') or {}).get('engine', DEFAULT_ENGINE)
+
+
+def render_markdown(text, config, rel_depth=2):
+    """Convert markdown to HTML with the engine selected in the configuration"""
+    if not text:
+        return ""
+    return get_markdown_engine(get_configured_engine_name(config))(text, config, rel_depth)
+
+
+def tokenize_markdown_lines(text, convert_image):
+    """First walk: apply the line-local inline rules and record backtick positions
+
+    Every inline rule except code spans is confined to a single line, so each line
+    is rewritten once, in the same rule order as the original cascade, and only
+    when it contains the rule's marker character. Code spans may cross lines, so
+    their backticks are collected as (line, column) tokens and paired afterwards.
+    """
+    lines = text.split('\n')
+    backticks = []
+
+    for line_no, line in enumerate(lines):
+        if '{' in line:
+            line = JEKYLL_TAG_PATTERN.sub('', line)
+        if '!' in line:
+            line = IMAGE_PATTERN.sub(convert_image, line)
+        if line[:1] == '#':
+            for prefix, open_tag, close_tag in HEADINGS:
+                if line.startswith(prefix):
+                    line = open_tag + line[len(prefix):] + close_tag
+                    break
+        if '*' in line:
+            if '***' in line:
+                line = BOLD_ITALIC_PATTERN.sub(r'<strong><em>\1</em></strong>', line)
+            if '**' in line:
+                line = BOLD_PATTERN.sub(r'<strong>\1</strong>', line)
+            line = ITALIC_PATTERN.sub(r'<em>\1</em>', line)
+        if '[' in line:
+            line = LINK_PATTERN.sub(r'<a href="\2">\1</a>', line)
+        if '`' in line:
+            col = line.find('`')
+            while col != -1:
+                backticks.append((line_no, col))
+                col = line.find('`', col + 1)
+        lines[line_no] = line
+
+    return lines, backticks
+
+
+def pair_code_spans(backticks):
+    """Pair backticks into code spans the way re.sub(r'`([^`]+)`') scans them
+
+    A backtick opens a span when the next backtick is not directly adjacent;
+    otherwise it stays literal and the adjacent one is tried as the opener.
+    Returns {line_no: [(column, tag), ...]} for the backticks to replace.
+    """
+    replacements = {}
+    i = 0
+    while i < len(backticks) - 1:
+        (open_line, open_col), (close_line, close_col) = backticks[i], backticks[i + 1]
+        if open_line == close_line and close_col == open_col + 1:
+            i += 1
+            continue
+        replacements.setdefault(open_line, []).append((open_col, '<code>'))
+        replacements.setdefault(close_line, []).append((close_col, '</code>'))
+        i += 2
+    return replacements
+
+
+def markdown_to_html(text, config, rel_depth=2):
+    """Convert markdown to HTML
+
+    Block-then-inline tokenizer: one walk rewrites each line and collects code
+    span markers, a second walk pairs them and emits lists and paragraphs into
+    a list buffer. Output is identical to markdown_to_html_regex().
+    """
+    if not text:
+        return ""
+
+    # Images: fix absolute paths relative to the output depth
+    def convert_image(match):
+        return render_image_tag(match.group(1), match.group(2), rel_depth)
+
+    lines, backticks = tokenize_markdown_lines(text, convert_image)
+    code_spans = pair_code_spans(backticks) if len(backticks) > 1 else {}
+
+    html_parts = []
+    paragraph = []
+    in_list = False
+
+    def flush_paragraph():
+        para = '\n'.join(paragraph).strip()
+        paragraph.clear()
+        if para:
+            # Don't wrap if already has HTML tags
+            if para[0] == '<':
+                html_parts.append(para)
+            else:
+                # Replace single newlines with <br>
+                html_parts.append('<p>' + para.replace('\n', '<br>\n') + '</p>')
+
+    for line_no, line in enumerate(lines):
+        if line_no in code_spans:
+            pieces = []
+            last = 0
+            for col, tag in code_spans[line_no]:
+                pieces.append(line[last:col])
+                pieces.append(tag)
+                last = col + 1
+            pieces.append(line[last:])
+            line = ''.join(pieces)
+
+        # Unordered lists
+        stripped = line.strip()
+        if stripped[:2] == '- ' or stripped[:2] == '* ':
+            if not in_list:
+                paragraph.append('<ul>')
+                in_list = True
+            paragraph.append(f'<li>{stripped[2:]}</li>')
+            continue
+
+        if in_list:
+            paragraph.append('</ul>')
+            in_list = False
+
+        # Blank lines separate paragraphs
+        if not line:
+            flush_paragraph()
+            continue
+
+        # Horizontal rules
+        if line[:3] == '---' and HR_PATTERN.fullmatch(line):
+            line = '<hr>'
+
+        paragraph.append(line)
+
+    if in_list:
+        paragraph.append('</ul>')
+    flush_paragraph()
+
+    return '\n'.join(html_parts)
+
+
+def markdown_to_html_regex(text, config, rel_depth=2):
+    """Convert markdown to HTML with the original whole-document re.sub cascade
+
+    Kept as the reference implementation for benchmarks and conformance checks;
+    markdown_to_html() must produce identical output.
+    """
+    if not text:
+        return ""
+
+    # Remove Jekyll includes
+    text = re.sub(r'\{%.*?%\}', '', text)
+
+    # Images (before links, as they use similar syntax)
+    def convert_image(match):
+        alt = match.group(1)
+        src = match.group(2)
+        # Fix image path if needed
+        if src.startswith('/'):
+            src = '../' * rel_depth + src[1:]
+        return f'<img src="{src}" alt="{alt}" class="content-image">'
+    text = re.sub(r'!\[(.*?)\]\((.*?)\)', convert_image, text)
+
+    # Headers
+    text = re.sub(r'^#### (.*?)$', r'<h4>\1</h4>', text, flags=re.MULTILINE)
+    text = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', text, flags=re.MULTILINE)
+    text = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', text, flags=re.MULTILINE)
+    text = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', text, flags=re.MULTILINE)
+
+    # Bold and italic
+    text = re.sub(r'\*\*\*(.*?)\*\*\*', r'<strong><em>\1</em></strong>', text)
+    text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', text)
+    text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', text)
+
+    # Links
+    text = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', text)
+
+    # Code blocks with backticks
+    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+
+    # Horizontal rules
+    text = re.sub(r'^---+$', '<hr>', text, flags=re.MULTILINE)
+
+    # Lists and paragraphs
+    lines = text.split('\n')
+    html_lines = []
+    in_list = False
+
+    for line in lines:
+        stripped = line.strip()
+
+        # Unordered lists
+        if stripped.startswith('- ') or stripped.startswith('* '):
+            if not in_list:
+                html_lines.append('<ul>')
+                in_list = True
+            html_lines.append(f'<li>{stripped[2:]}</li>')
+        else:
+            if in_list:
+                html_lines.append('</ul>')
+                in_list = False
+            html_lines.append(line)
+
+    if in_list:
+        html_lines.append('</ul>')
+
+    text = '\n'.join(html_lines)
+
+    # Paragraphs (simple approach)
+    paragraphs = text.split('\n\n')
+    html_paragraphs = []
+
+    for para in paragraphs:
+        para = para.strip()
+        if para:
+            # Don't wrap if already has HTML tags
+            if para.startswith('<'):
+                html_paragraphs.append(para)
+            else:
+                # Replace single newlines with <br>
+                para = para.replace('\n', '<br>\n')
+                html_paragraphs.append(f'<p>{para}</p>')
+
+    return '\n'.join(html_paragraphs)
+
+
+def _create_markdown_it_engine():
+    """markdown-it-py (CommonMark) with tables; raw HTML enabled for the prepared <img> tags"""
+    try:
+        from markdown_it import MarkdownIt
+    except ImportError:
+        raise ImportError("Markdown engine 'markdown-it' requires the markdown-it-py package "
+                          "(pip install markdown-it-py)")
+
+    md = MarkdownIt('commonmark', {'html': True}).enable('table')
+
+    def render(text, config, rel_depth=2):
+        return md.render(prepare_source(text, rel_depth)).strip()
+
+    return render
+
+
+def _create_mistune_engine():
+    """mistune 2.x/3.x with tables; escaping disabled for the prepared <img> tags"""
+    try:
+        import mistune
+    except ImportError:
+        raise ImportError("Markdown engine 'mistune' requires the mistune package (pip install mistune)")
+
+    md = mistune.create_markdown(escape=False, plugins=['table', 'strikethrough'])
+
+    def render(text, config, rel_depth=2):
+        return md(prepare_source(text, rel_depth)).strip()
+
+    return render
+
+
+# The built-in engines; alternatives are selected with markdown.engine in the config
+register_engine('builtin', markdown_to_html)
+register_engine('regex', markdown_to_html_regex)
+register_engine_factory('markdown-it', _create_markdown_it_engine)
+register_engine_factory('mistune', _create_mistune_engine)
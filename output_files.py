@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Output file helpers shared by the converters
+Change-aware copying that uses the cheapest kernel copy path available, and an atomic
+writer that leaves files whose content did not change untouched
+"""
+
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+from build_manifest import hash_bytes, hash_file
+
+# Outcomes of write_if_changed() / AtomicWriter, in report order
+WRITE_STATUSES = ('new', 'updated', 'unchanged')
+
+# Permissions open() gives new files (0666 minus the umask), found on first use (mkstemp uses 0600)
+_new_file_mode = None
+
+# ioctl request for a copy-on-write clone of a whole file (btrfs, XFS, ...), see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+# Errors meaning "this copy mechanism is not supported here", so the next one is tried
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL,
+                      errno.EPERM, errno.EBADF, errno.ETXTBSY}
+
+
+def files_match(source_file, dest_file):
+    """True when dest_file already holds the same content as source_file
+
+    Sizes must match; equal mtimes are trusted (copies preserve them), otherwise the
+    content hashes decide.
+    """
+    try:
+        source_stat = os.stat(source_file)
+        dest_stat = os.stat(dest_file)
+    except OSError:
+        return False
+
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if source_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    return hash_file(source_file) == hash_file(dest_file)
+
+
+def _reflink(source_fd, dest_fd, size):
+    fcntl.ioctl(dest_fd, FICLONE, source_fd)
+    return 0
+
+
+def _copy_file_range(source_fd, dest_fd, size):
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(source_fd, dest_fd, size - copied)
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+def _sendfile(source_fd, dest_fd, size):
+    copied = 0
+    while copied < size:
+        count = os.sendfile(dest_fd, source_fd, copied, size - copied)
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+# Cheapest first; each returns the number of bytes moved through the kernel
+KERNEL_COPY_METHODS = [('reflink', _reflink)]
+if hasattr(os, 'copy_file_range'):
+    KERNEL_COPY_METHODS.append(('copy_file_range', _copy_file_range))
+if hasattr(os, 'sendfile'):
+    KERNEL_COPY_METHODS.append(('sendfile', _sendfile))
+
+
+def _copy_contents(source_file, tmp_fd):
+    """Copy file data into tmp_fd using the first kernel method that works"""
+    with open(source_file, 'rb') as source:
+        size = os.fstat(source.fileno()).st_size
+        for method, copy in KERNEL_COPY_METHODS:
+            try:
+                return method, copy(source.fileno(), tmp_fd, size)
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                # A partial attempt must not leave data behind for the next method
+                os.lseek(tmp_fd, 0, os.SEEK_SET)
+                os.ftruncate(tmp_fd, 0)
+                source.seek(0)
+
+        with os.fdopen(os.dup(tmp_fd), 'wb') as dest:
+            shutil.copyfileobj(source, dest)
+        return 'read/write', size
+
+
+def copy_file(source_file, dest_file, hardlink=False):
+    """Copy source_file to dest_file unless it already matches; returns (method, bytes moved)
+
+    method is 'unchanged' when nothing was done. With hardlink=True the destination
+    becomes a hard link to the source (no data moved) when both are on one filesystem.
+    Otherwise the data goes into a temp file beside the destination via reflink,
+    copy_file_range or sendfile, keeps the source metadata like shutil.copy2, and is
+    moved into place with os.replace.
+    """
+    source_file = Path(source_file)
+    dest_file = Path(dest_file)
+
+    if files_match(source_file, dest_file):
+        # Same content under a different mtime (e.g. after a checkout): copy the source's
+        # metadata so later builds take the size + mtime fast path instead of hashing again
+        try:
+            if source_file.stat().st_mtime_ns != dest_file.stat().st_mtime_ns:
+                shutil.copystat(source_file, dest_file)
+        except OSError:
+            pass
+        return 'unchanged', 0
+
+    dest_file.parent.mkdir(parents=True, exist_ok=True)
+
+    if hardlink:
+        tmp_name = str(dest_file.parent / f'.tmp-{os.getpid()}-{dest_file.name}')
+        try:
+            os.link(source_file, tmp_name)
+            os.replace(tmp_name, dest_file)
+            return 'hardlink', 0
+        except OSError:
+            # Different filesystem or no link support: fall back to copying
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+    fd, tmp_name = tempfile.mkstemp(dir=dest_file.parent, prefix='.tmp-')
+    try:
+        try:
+            method, moved = _copy_contents(source_file, fd)
+        finally:
+            os.close(fd)
+        shutil.copystat(source_file, tmp_name)
+        os.replace(tmp_name, dest_file)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    return method, moved
+
+
+def new_write_counts():
+    """Per-build counters for the write statuses"""
+    return dict.fromkeys(WRITE_STATUSES, 0)
+
+
+def _compare_existing(output_file, size, digest):
+    """'new' when output_file does not exist, else 'unchanged' or 'updated'"""
+    try:
+        existing_size = os.stat(output_file).st_size
+    except FileNotFoundError:
+        return 'new'
+    if existing_size == size and hash_file(output_file) == digest:
+        return 'unchanged'
+    return 'updated'
+
+
+def _default_file_mode(directory):
+    """Mode of a file newly created by open(), probed once with a real file
+
+    Reading the umask with os.umask() would briefly change it for the whole process,
+    racing with file creation in other threads.
+    """
+    global _new_file_mode
+    if _new_file_mode is None:
+        probe = os.path.join(directory, f'.mode-probe-{os.getpid()}-{threading.get_ident()}')
+        fd = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            _new_file_mode = stat.S_IMODE(os.fstat(fd).st_mode)
+        finally:
+            os.close(fd)
+            os.unlink(probe)
+    return _new_file_mode
+
+
+def _replace_from_temp(tmp_name, output_file):
+    # Replaced files keep their permissions; new ones get the default open() would give
+    try:
+        shutil.copymode(output_file, tmp_name)
+    except FileNotFoundError:
+        os.chmod(tmp_name, _default_file_mode(os.path.dirname(tmp_name)))
+    os.replace(tmp_name, output_file)
+
+
+def write_if_changed(output_file, text, encoding='utf-8'):
+    """Write text to output_file unless it already holds exactly that content
+
+    Real writes go to a temp file in the same directory that is moved into place with
+    os.replace, so readers never see a half-written page. Returns 'new', 'updated'
+    or 'unchanged'; an unchanged file keeps its mtime.
+    """
+    return write_bytes_if_changed(output_file, text.encode(encoding))
+
+
+def write_bytes_if_changed(output_file, data):
+    """write_if_changed() for data that is already encoded"""
+    output_file = Path(output_file)
+    status = _compare_existing(output_file, len(data), hash_bytes(data))
+    if status == 'unchanged':
+        return status
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        _replace_from_temp(tmp_name, output_file)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return status
+
+
+class AtomicWriter:
+    """Streaming counterpart of write_if_changed()
+
+    Text is encoded, hashed and written to a temp file as it arrives; on close the
+    temp file replaces output_file only if the content differs. Use as a context
+    manager: an exception discards the temp file and leaves output_file untouched.
+    """
+
+    def __init__(self, output_file, encoding='utf-8', buffering=-1):
+        self.output_file = Path(output_file)
+        self.encoding = encoding
+        self.status = None
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_name = tempfile.mkstemp(dir=self.output_file.parent, prefix='.tmp-')
+        self._file = os.fdopen(fd, 'wb', buffering=buffering)
+
+    def write(self, text):
+        data = text.encode(self.encoding)
+        self._digest.update(data)
+        self._size += len(data)
+        self._file.write(data)
+
+    def commit(self):
+        """Finish the write; returns 'new', 'updated' or 'unchanged'"""
+        self._file.close()
+        self.status = _compare_existing(self.output_file, self._size, self._digest.hexdigest())
+        if self.status == 'unchanged':
+            os.unlink(self._tmp_name)
+        else:
+            _replace_from_temp(self._tmp_name, self.output_file)
+        return self.status
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.unlink(self._tmp_name)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
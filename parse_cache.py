@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk cache for parsed frontmatter and converted markdown bodies
+Entries are keyed by content hash, evicted least-recently-used beyond a size cap,
+and written atomically so concurrent builds and worker processes can share it
+"""
+
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from build_manifest import compute_build_key
+
+# Bump when the layout or the meaning of cached values changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = '.cache/parse'
+DEFAULT_MAX_SIZE_MB = 64
+
+# Returned by ParseCache.get() on a miss (None is a valid cached value)
+MISSING = object()
+
+
+class ParseCache:
+    """Content-addressed pickle store with LRU eviction by file mtime"""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, namespace, key):
+        return self.cache_dir / namespace / key[:2] / f'{key}.pickle'
+
+    def get(self, namespace, key):
+        """Return the cached value or MISSING; a hit refreshes the entry's LRU position"""
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            self.misses += 1
+            return MISSING
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, namespace, key, value):
+        """Store a value; the temp file + os.replace makes concurrent writers safe"""
+        path = self._path(namespace, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_name, path)
+        except OSError:
+            # The cache is an optimization; a failed write must never fail the build
+            try:
+                os.unlink(tmp_name)
+            except (OSError, UnboundLocalError):
+                pass
+
+    def get_or_compute(self, namespace, key, compute):
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(namespace, key)
+        if value is MISSING:
+            value = compute()
+            self.put(namespace, key, value)
+        return value
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.rglob('*.pickle'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        if total <= self.max_bytes:
+            return removed
+
+        for _, size, path in sorted(entries):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            removed += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+        return removed
+
+
+def make_cache_key(*parts):
+    """Cache key for a set of inputs, including the cache format version"""
+    return compute_build_key(CACHE_VERSION, *parts)
+
+
+def open_parse_cache(config):
+    """Create the parse cache described by the `cache` config section, or None when disabled"""
+    cache_config = config.get('cache') or {}
+    if not cache_config.get('enabled', True):
+        return None
+    cache_dir = cache_config.get('dir', DEFAULT_CACHE_DIR)
+    max_bytes = int(float(cache_config.get('max_size_mb', DEFAULT_MAX_SIZE_MB)) * 1024 * 1024)
+    return ParseCache(cache_dir, max_bytes)
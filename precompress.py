@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Precompressed output sidecars
+Writes maximum-level .gz (and, with the brotli package, .br) copies of the HTML, CSS,
+JSON and SVG files in the output tree so the static host can serve them without
+compressing at request time. Files whose sidecars are current are skipped.
+"""
+
+import argparse
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from output_files import write_bytes_if_changed
+from yaml_loader import load_yaml_config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_FORMATS = ['gzip', 'brotli']
+DEFAULT_EXTENSIONS = ['.html', '.css', '.json', '.svg']
+
+SIDECAR_SUFFIXES = {'gzip': '.gz', 'brotli': '.br'}
+
+
+def available_formats(formats):
+    """The configured formats that can be written here (brotli needs the brotli package)"""
+    return [fmt for fmt in formats if fmt in SIDECAR_SUFFIXES and (fmt != 'brotli' or brotli)]
+
+
+def sidecar_path(path, fmt):
+    return Path(f"{path}{SIDECAR_SUFFIXES[fmt]}")
+
+
+def compress(data, fmt):
+    if fmt == 'gzip':
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+
+
+def sidecars_current(path, formats):
+    """True when every sidecar exists and carries the source's mtime (set when it was written)"""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        return all(os.stat(sidecar_path(path, fmt)).st_mtime_ns == mtime_ns for fmt in formats)
+    except OSError:
+        return False
+
+
+def compress_file(task):
+    """Write the sidecars of one file (runs in worker processes); returns their sizes"""
+    path = Path(task['path'])
+    stat = os.stat(path)
+    data = path.read_bytes()
+    sizes = {}
+    for fmt in task['formats']:
+        output_file = sidecar_path(path, fmt)
+        write_bytes_if_changed(output_file, compress(data, fmt))
+        # Stamp the source mtime on the sidecar: an unchanged output (which keeps its
+        # mtime) is recognized as already compressed on the next run
+        os.utime(output_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        sizes[fmt] = output_file.stat().st_size
+    return {'path': task['path'], 'size': len(data), 'sizes': sizes}
+
+
+def find_compressible_files(root_dir, extensions):
+    extensions = {extension.lower() for extension in extensions}
+    return sorted(path for path in Path(root_dir).rglob('*')
+                  if path.suffix.lower() in extensions and path.is_file())
+
+
+def remove_orphaned_sidecars(root_dir, extensions):
+    """Delete sidecars whose source file no longer exists; returns how many were removed"""
+    extensions = {extension.lower() for extension in extensions}
+    removed = 0
+    for suffix in SIDECAR_SUFFIXES.values():
+        for sidecar in Path(root_dir).rglob(f'*{suffix}'):
+            source = sidecar.with_suffix('')
+            if source.suffix.lower() in extensions and not source.exists():
+                sidecar.unlink()
+                removed += 1
+    return removed
+
+
+def precompress_tree(root_dir, formats=None, extensions=None, jobs=None):
+    """Compress changed files under root_dir in parallel; returns a summary dict
+
+    The summary has the number of files compressed and skipped, and per file type
+    the file count, original bytes and sidecar bytes per format (over all files).
+    """
+    configured = formats or DEFAULT_FORMATS
+    formats = available_formats(configured)
+    summary = {'formats': formats, 'unavailable': [fmt for fmt in configured if fmt not in formats],
+               'compressed': 0, 'skipped': 0, 'removed': 0, 'types': {}}
+    if not formats:
+        return summary
+
+    extensions = extensions or DEFAULT_EXTENSIONS
+    summary['removed'] = remove_orphaned_sidecars(root_dir, extensions)
+
+    results = []
+    tasks = []
+    for path in find_compressible_files(root_dir, extensions):
+        if sidecars_current(path, formats):
+            results.append({'path': str(path), 'size': path.stat().st_size,
+                            'sizes': {fmt: sidecar_path(path, fmt).stat().st_size for fmt in formats}})
+            summary['skipped'] += 1
+        else:
+            tasks.append({'path': str(path), 'formats': formats})
+
+    if len(tasks) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results.extend(executor.map(compress_file, tasks, chunksize=max(1, len(tasks) // 32)))
+    else:
+        results.extend(compress_file(task) for task in tasks)
+    summary['compressed'] = len(tasks)
+
+    for result in results:
+        suffix = Path(result['path']).suffix.lower()
+        totals = summary['types'].setdefault(suffix, {'files': 0, 'bytes': 0,
+                                                      **{fmt: 0 for fmt in formats}})
+        totals['files'] += 1
+        totals['bytes'] += result['size']
+        for fmt, size in result['sizes'].items():
+            totals[fmt] += size
+
+    return summary
+
+
+def format_summary(summary):
+    """Report lines: counts, then the compression ratio per file type"""
+    if not summary['formats']:
+        return [f"Precompression: no supported formats (unavailable: {', '.join(summary['unavailable'])})"]
+
+    lines = [f"Precompression ({', '.join(summary['formats'])}): compressed {summary['compressed']} files, "
+             f"skipped {summary['skipped']} unchanged"
+             + (f", removed {summary['removed']} orphaned sidecars" if summary['removed'] else "")]
+    for suffix, totals in sorted(summary['types'].items()):
+        ratios = ', '.join(f"{fmt} {totals[fmt] / totals['bytes']:.1%}" if totals['bytes'] else f"{fmt} -"
+                           for fmt in summary['formats'])
+        lines.append(f"  {suffix:<6} {totals['files']:>5} files  {totals['bytes'] / 1024:>9.1f} KB  → {ratios}")
+    if 'brotli' in summary['unavailable']:
+        lines.append("  (brotli package not installed: .br sidecars skipped)")
+    return lines
+
+
+def precompress_output(config):
+    """Run the `precompress` config section over the output directory; None when disabled"""
+    settings = config.get('precompress') or {}
+    if not settings.get('enabled', False):
+        return None
+    return precompress_tree(settings.get('root_dir') or config['output']['root_dir'],
+                            settings.get('formats', DEFAULT_FORMATS),
+                            settings.get('extensions', DEFAULT_EXTENSIONS),
+                            settings.get('jobs', 0) or None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write .gz/.br sidecars for the generated site')
+    parser.add_argument('root_dir', nargs='?', help='Output directory (default: output.root_dir from the config)')
+    parser.add_argument('--config', default='convert_config_generic.yml', help='Config file')
+    parser.add_argument('--jobs', '-j', type=int, default=0, metavar='N',
+                        help='Worker processes (0 = one per CPU)')
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.config)
+    settings = config.get('precompress') or {}
+    summary = precompress_tree(args.root_dir or config['output']['root_dir'],
+                               settings.get('formats', DEFAULT_FORMATS),
+                               settings.get('extensions', DEFAULT_EXTENSIONS),
+                               args.jobs or None)
+    print('\n'.join(format_summary(summary)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Build profiling with Chrome trace output
+Records a span for each stage of each file (and for the build-wide steps) and writes
+them as Chrome trace JSON, viewable in chrome://tracing or https://ui.perfetto.dev.
+Spans from worker processes keep their pid, so each worker gets its own track.
+When profiling is off the converters use NULL_PROFILER, whose spans do nothing.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_TRACE_FILE = '.cache/profile/trace.json'
+DEFAULT_TOP_FILES = 10
+
+# Span categories: per-file stages (summed per file), whole pages and build-wide steps
+STAGE = 'stage'
+PAGE = 'page'
+BUILD = 'build'
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'category', 'file', 'start')
+
+    def __init__(self, profiler, name, category, file):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.file = file
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.category, self.start, time.perf_counter_ns(), self.file)
+        return False
+
+
+class Profiler:
+    """Collects spans as Chrome trace 'complete' events
+
+    Timestamps come from time.perf_counter_ns(), a system-wide monotonic clock, so
+    spans recorded in worker processes line up with the main process.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    def span(self, name, file=None, category=STAGE):
+        """Context manager timing one stage (of one file, when given)"""
+        return _Span(self, name, category, file)
+
+    def record(self, name, category, start_ns, end_ns, file=None):
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': start_ns / 1000,
+                 'dur': (end_ns - start_ns) / 1000, 'pid': os.getpid(), 'tid': threading.get_native_id()}
+        if file is not None:
+            event['args'] = {'file': str(file)}
+        self.events.append(event)
+
+    def take_events(self):
+        """Events recorded since the last call (for returning them from a worker)"""
+        events, self.events = self.events, []
+        return events
+
+    def extend(self, events):
+        self.events.extend(events)
+
+    def write_trace(self, path=DEFAULT_TRACE_FILE):
+        """Write the Chrome trace JSON; the main process and each worker are named tracks"""
+        main_pid = os.getpid()
+        pids = sorted({event['pid'] for event in self.events} | {main_pid})
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                     'args': {'name': 'main' if pid == main_pid else f'worker {pid}'}} for pid in pids]
+        metadata += [{'name': 'process_sort_index', 'ph': 'M', 'pid': pid, 'tid': 0,
+                      'args': {'sort_index': 0 if pid == main_pid else 1}} for pid in pids]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}),
+                        encoding='utf-8')
+        return path
+
+    def stage_totals(self):
+        """{stage: seconds} over all files, largest first"""
+        totals = {}
+        for event in self.events:
+            if event['cat'] == STAGE:
+                totals[event['name']] = totals.get(event['name'], 0.0) + event['dur'] / 1e6
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def slowest_files(self, count=DEFAULT_TOP_FILES):
+        """[(file, seconds, {stage: seconds})] of the files whose stages took longest"""
+        files = {}
+        for event in self.events:
+            if event['cat'] == STAGE and 'args' in event:
+                stages = files.setdefault(event['args']['file'], {})
+                stages[event['name']] = stages.get(event['name'], 0.0) + event['dur'] / 1e6
+        ranked = sorted(files.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return [(file, sum(stages.values()), stages) for file, stages in ranked[:count]]
+
+    def format_summary(self, trace_file, count=DEFAULT_TOP_FILES):
+        """Report lines: time per stage, the slowest files with their stage breakdown, build steps"""
+        lines = [f"Profile: {len(self.events)} spans written to {trace_file}"]
+        totals = self.stage_totals()
+        if totals:
+            lines.append('  Stages (all files): ' + ', '.join(f"{name} {seconds * 1000:.1f} ms"
+                                                                for name, seconds in totals.items()))
+        slowest = self.slowest_files(count)
+        if slowest:
+            lines.append(f"  Slowest {len(slowest)} files:")
+            for file, seconds, stages in slowest:
+                breakdown = ', '.join(f"{name} {stage_seconds * 1000:.1f}" for name, stage_seconds
+                                      in sorted(stages.items(), key=lambda item: item[1], reverse=True)[:4])
+                lines.append(f"    {seconds * 1000:>8.1f} ms  {file}  ({breakdown})")
+        steps = [event for event in self.events if event['cat'] == BUILD]
+        if steps:
+            lines.append('  Build steps: ' + ', '.join(f"{event['name']} {event['dur'] / 1000:.1f} ms"
+                                                        for event in steps))
+        return lines
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullProfiler:
+    """Profiler stand-in used when profiling is off: spans are a shared no-op"""
+
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, name, file=None, category=STAGE):
+        return self._span
+
+    def record(self, name, category, start_ns, end_ns, file=None):
+        pass
+
+    def take_events(self):
+        return []
+
+    def extend(self, events):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def add_profile_arguments(parser):
+    """--profile [TRACE_FILE] and --profile-top N, shared by the converters"""
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_TRACE_FILE, metavar='TRACE_FILE',
+                        help=f'Record a span per stage of each file and write a Chrome trace '
+                             f'(default: {DEFAULT_TRACE_FILE}) plus a slowest-files summary')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP_FILES, metavar='N',
+                        help=f'With --profile: number of slowest files to list (default: {DEFAULT_TOP_FILES})')
+
+
+def open_profiler(enabled):
+    """A recording profiler, or NULL_PROFILER when profiling is off"""
+    return Profiler() if enabled else NULL_PROFILER
+
+
+def finish_profile(profiler, trace_file=DEFAULT_TRACE_FILE, count=DEFAULT_TOP_FILES):
+    """Write the trace and print the summary (nothing when profiling is off)"""
+    if not profiler.enabled:
+        return
+    path = profiler.write_trace(trace_file)
+    print('\n'.join(profiler.format_summary(path, count)))
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Sharded client-side search index
+Tokenizes the title, tags, excerpt and body text of each converted page into weighted
+terms and writes an inverted index split into small JSON shards keyed by term prefix,
+so a query only downloads the shards of its own terms. Per-page terms are kept in a
+state file, so an incremental build only re-tokenizes the pages it rebuilt and only
+the shards whose content changed are rewritten.
+"""
+
+import html
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+from output_files import write_if_changed
+
+# Bump when tokenizing or the shard format changes so every page is re-indexed
+INDEX_VERSION = 2
+
+DEFAULT_OUTPUT_DIR = 'w/search'
+DEFAULT_STATE_FILE = '.cache/search/state.json'
+DEFAULT_PREFIX_LENGTH = 2
+
+# Converters sharing one index each own the documents they wrote; a build only drops its own
+DEFAULT_WRITER = 'pages'
+
+# Weight of a term occurrence per field
+FIELD_WEIGHTS = {'title': 5, 'tags': 3, 'excerpt': 2, 'text': 1}
+
+# Titles and excerpts are stored in chunks of this many documents (by id)
+DOCUMENTS_PER_CHUNK = 64
+
+# Layout below the output directory (no leading underscores: Jekyll would not publish them)
+META_FILE = 'meta.json'
+SHARD_FILE = 'terms/{name}.json'
+DOCUMENTS_FILE = 'docs/{chunk}.json'
+
+MIN_TERM_LENGTH = 2
+EXCERPT_LENGTH = 160
+
+STOPWORDS = frozenset('''
+a an and are as at be but by can for from has have how i if in into is it its of on or our
+so that the their them then there these they this to was we were what when which who will
+with you your
+'''.split())
+
+# Keys of parsed page data (index cards, software list tables) holding text people read;
+# the rest are CSS classes, colors, links and dates
+TEXT_FIELDS = frozenset(['title', 'header_title', 'intro', 'section_title', 'summary', 'name',
+                         'description', 'category', 'years', 'year', 'years_active'])
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def html_to_text(markup):
+    """Visible text of an HTML fragment"""
+    markup = re.sub(r'<(script|style)\b.*?</\1>', ' ', markup, flags=re.IGNORECASE | re.DOTALL)
+    return ' '.join(html.unescape(TAG_PATTERN.sub(' ', markup)).split())
+
+
+def collect_text(value, fields=TEXT_FIELDS):
+    """Readable strings in a nested structure of dicts and lists (e.g. parse_software_list() output)
+
+    Dict strings are only taken from keys in `fields`; nested dicts and lists are searched
+    under any key.
+    """
+    if isinstance(value, str):
+        text = html_to_text(value)
+        return [text] if text else []
+    if isinstance(value, dict):
+        value = [item for key, item in value.items() if key in fields or not isinstance(item, str)]
+    if isinstance(value, (list, tuple)):
+        return [text for item in value for text in collect_text(item, fields)]
+    return []
+
+
+def normalize(text):
+    """Lowercase and strip accents, so 'Café' and 'cafe' are the same term"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return [word for word in WORD_PATTERN.findall(normalize(text))
+            if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS]
+
+
+def page_terms(fields):
+    """{term: weight} for a page's fields (title, tags, excerpt, text)"""
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = fields.get(field) or ''
+        if isinstance(value, (list, tuple)):
+            value = ' '.join(str(item) for item in value)
+        for term in tokenize(str(value)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def make_search_document(url, title, body_text, frontmatter=None):
+    """Search document of a rendered page: what the results list shows, plus its terms"""
+    frontmatter = frontmatter or {}
+    excerpt = str(frontmatter.get('excerpt') or '')
+    tags = frontmatter.get('tags') or []
+    if isinstance(tags, str):
+        tags = [tags]
+    fields = {'title': title, 'tags': tags, 'excerpt': excerpt, 'text': body_text}
+    summary = excerpt or body_text[:EXCERPT_LENGTH].rsplit(' ', 1)[0].strip()
+    return {'url': url, 'title': html_to_text(str(title)), 'excerpt': summary, 'terms': page_terms(fields)}
+
+
+def shard_name(term, prefix_length=DEFAULT_PREFIX_LENGTH):
+    """File-name-safe shard key: the term's first characters (non-ASCII as hex code points)"""
+    return ''.join(char if char.isascii() and char.isalnum() else f'-{ord(char):x}-'
+                   for char in term[:prefix_length])
+
+
+class SearchIndex:
+    """Per-page search documents kept across builds, written out as prefix shards"""
+
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, state_file=DEFAULT_STATE_FILE,
+                 prefix_length=DEFAULT_PREFIX_LENGTH, writer=DEFAULT_WRITER):
+        self.output_dir = Path(output_dir)
+        self.state_file = Path(state_file)
+        self.prefix_length = prefix_length
+        self.writer = writer
+        self.state = self._load_state()
+        self.updated = 0
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if state.get('version') != INDEX_VERSION or state.get('prefix_length') != self.prefix_length:
+            state = {}
+        state.setdefault('version', INDEX_VERSION)
+        state.setdefault('prefix_length', self.prefix_length)
+        state.setdefault('next_id', 0)
+        state.setdefault('pages', {})
+        return state
+
+    def has_page(self, source_key, build_key):
+        """True when the page's document is indexed for exactly this build of it"""
+        entry = self.state['pages'].get(source_key)
+        return bool(entry) and entry.get('key') == build_key
+
+    def update_page(self, source_key, build_key, document):
+        """Store a rebuilt page's document; its id stays the same across builds"""
+        previous = self.state['pages'].get(source_key)
+        if previous:
+            doc_id = previous['id']
+        else:
+            doc_id = self.state['next_id']
+            self.state['next_id'] += 1
+        self.state['pages'][source_key] = {'id': doc_id, 'key': build_key, 'writer': self.writer, **document}
+        self.updated += 1
+
+    def page_url(self, output_file):
+        """URL of an output page relative to the site root the index is served from"""
+        return Path(os.path.relpath(output_file, self.output_dir.parent)).as_posix()
+
+    def write(self, source_keys):
+        """Write the shards for the given pages; returns a summary dict
+
+        This writer's other documents are dropped, documents of other writers (e.g. the
+        portfolio converter's) are kept. Only shards whose content changed are rewritten,
+        and shards of terms that no longer occur are deleted, so unchanged shards keep
+        their HTTP cache validity.
+        """
+        source_keys = set(source_keys)
+        self.state['pages'] = {key: entry for key, entry in self.state['pages'].items()
+                               if key in source_keys or entry.get('writer', DEFAULT_WRITER) != self.writer}
+
+        shards = {}
+        documents = {}
+        for entry in self.state['pages'].values():
+            documents[entry['id']] = {'url': entry['url'], 'title': entry['title'], 'excerpt': entry['excerpt']}
+            for term, weight in entry['terms'].items():
+                postings = shards.setdefault(shard_name(term, self.prefix_length), {}).setdefault(term, [])
+                postings.append([entry['id'], weight])
+
+        files = {}
+        for name, terms in shards.items():
+            for postings in terms.values():
+                postings.sort(key=lambda posting: (-posting[1], posting[0]))
+            files[SHARD_FILE.format(name=name)] = terms
+        for doc_id, document in documents.items():
+            chunk = files.setdefault(DOCUMENTS_FILE.format(chunk=doc_id // DOCUMENTS_PER_CHUNK), {})
+            chunk[str(doc_id)] = document
+        files[META_FILE] = {'version': INDEX_VERSION, 'prefix_length': self.prefix_length,
+                            'documents_per_chunk': DOCUMENTS_PER_CHUNK, 'shards': sorted(shards)}
+
+        summary = {'documents': len(documents), 'shards': len(shards), 'written': 0, 'removed': 0,
+                   'terms': sum(len(terms) for terms in shards.values()), 'largest_shard': 0}
+        for name, content in files.items():
+            text = json.dumps(content, sort_keys=True, separators=(',', ':'))
+            if name.startswith('terms/'):
+                summary['largest_shard'] = max(summary['largest_shard'], len(text))
+            if write_if_changed(self.output_dir / name, text) != 'unchanged':
+                summary['written'] += 1
+
+        # Shards of terms that no longer occur (and chunks of removed documents)
+        for stale_file in self.output_dir.glob('*/*.json'):
+            if stale_file.relative_to(self.output_dir).as_posix() not in files:
+                stale_file.unlink()
+                summary['removed'] += 1
+
+        self._save_state()
+        return summary
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix(f'.tmp-{os.getpid()}')
+        tmp_path.write_text(json.dumps(self.state, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.state_file)
+
+
+def open_search_index(config, writer=DEFAULT_WRITER):
+    """Create the index described by the `search` config section, or None when disabled"""
+    settings = config.get('search') or {}
+    if not settings.get('enabled', False):
+        return None
+    return SearchIndex(settings.get('output_dir') or f"{config['output']['root_dir']}/search",
+                       settings.get('state_file', DEFAULT_STATE_FILE),
+                       int(settings.get('prefix_length', DEFAULT_PREFIX_LENGTH)), writer)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Incremental sitemap.xml and Atom feed
+Keeps a small state file with the title, date and content hash of every published page,
+so a build only reads the frontmatter of sources that changed and only moves a page's
+<lastmod> when its output actually changed. The output hash and lastmod of every page are
+also kept in a lastmod file that is committed with the output, so a fresh checkout (where
+the state file does not exist) keeps the committed lastmod values.
+"""
+
+import json
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from build_manifest import hash_file
+from frontmatter import read_heading_title, scan_frontmatter
+from output_files import write_if_changed
+
+DEFAULT_STATE_FILE = '.cache/feed/state.json'
+DEFAULT_SECTIONS = ['posts', 'portfolio']
+DEFAULT_FEED_ENTRIES = 20
+
+
+def normalize_date(value):
+    """ISO date (YYYY-MM-DD) for a frontmatter date, or None when it cannot be read
+
+    Accepts dates parsed by YAML, 'YYYY-MM-DD' strings and the 'Month YYYY' form that
+    format_date() displays (taken as the first of the month).
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    for date_format in ('%Y-%m-%d', '%B %Y'):
+        try:
+            return datetime.strptime(str(value).strip(), date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class SitemapFeed:
+    """Sitemap and feed entries kept across builds"""
+
+    def __init__(self, output_root, base_url, state_file=DEFAULT_STATE_FILE, sections=None,
+                 feed_title='', feed_entries=DEFAULT_FEED_ENTRIES, feed_author='', lastmod_file=None):
+        self.output_root = Path(output_root)
+        self.base_url = base_url.rstrip('/') + '/'
+        self.state_file = Path(state_file)
+        self.lastmod_file = Path(lastmod_file) if lastmod_file else default_lastmod_file(output_root)
+        self.sections = sections if sections is not None else DEFAULT_SECTIONS
+        self.feed_title = feed_title
+        self.feed_entries = feed_entries
+        # Atom requires an author; a feed-level one covers every entry
+        self.feed_author = feed_author or feed_title
+        self.state = self._load_json(self.state_file)
+        self.committed = self._load_json(self.lastmod_file)
+        self.summary = {'pages': 0, 'read': 0, 'changed': 0}
+
+    @staticmethod
+    def _load_json(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_file.with_suffix(f'.tmp-{os.getpid()}')
+        tmp_path.write_text(json.dumps(self.state, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.state_file)
+
+    def includes(self, output_file):
+        """True for outputs in one of the published sections (e.g. w/posts/)"""
+        try:
+            relative = Path(output_file).relative_to(self.output_root)
+        except ValueError:
+            return False
+        return len(relative.parts) > 1 and relative.parts[0] in self.sections
+
+    def update(self, pages, build_time=None):
+        """Refresh the entries of (source file, source hash, output file) tuples
+
+        Frontmatter is only read for sources whose hash changed. lastmod moves to
+        build_time only when the output's content hash changed (the output's mtime and
+        size are checked first, so unchanged outputs are not hashed).
+        """
+        build_time = _timestamp(build_time or datetime.now(timezone.utc))
+        entries = {}
+        for source_file, source_hash, output_file in pages:
+            output_file = Path(output_file)
+            if not self.includes(output_file):
+                continue
+            try:
+                stat = output_file.stat()
+            except OSError:
+                continue  # not generated (yet), e.g. a portfolio page before convert_portfolio.py ran
+
+            key = Path(source_file).as_posix()
+            entry = dict(self.state.get(key, {}))
+            url = output_file.relative_to(self.output_root).as_posix()
+            if 'output_hash' not in entry and url in self.committed:
+                # No local state (fresh checkout): start from the committed hash and lastmod,
+                # so the lastmod only moves if the output differs from the committed one
+                entry.update(self.committed[url])
+            if entry.get('source_hash') != source_hash:
+                frontmatter = scan_frontmatter(source_file)
+                # Same title as the page: the frontmatter's, else the first H1 of the body
+                title = frontmatter.get('title') or read_heading_title(source_file) or output_file.stem
+                entry.update({'source_hash': source_hash,
+                              'title': str(title),
+                              'date': normalize_date(frontmatter.get('date')),
+                              'summary': str(frontmatter.get('excerpt') or '')})
+                self.summary['read'] += 1
+
+            if (entry.get('mtime_ns'), entry.get('size')) != (stat.st_mtime_ns, stat.st_size):
+                output_hash = hash_file(output_file)
+                if entry.get('output_hash') != output_hash:
+                    entry['output_hash'] = output_hash
+                    entry['lastmod'] = build_time
+                    self.summary['changed'] += 1
+                entry['mtime_ns'], entry['size'] = stat.st_mtime_ns, stat.st_size
+
+            entry['url'] = url
+            entries[key] = entry
+
+        self.state = entries
+        self.summary['pages'] = len(entries)
+
+    def render_sitemap(self):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for entry in sorted(self.state.values(), key=lambda entry: entry['url']):
+            lines.append(f"  <url><loc>{escape(self.base_url + entry['url'])}</loc>"
+                         f"<lastmod>{entry['lastmod']}</lastmod></url>")
+        lines.append('</urlset>')
+        return '\n'.join(lines) + '\n'
+
+    def render_feed(self):
+        """Atom feed of the newest entries (by frontmatter date, then lastmod)"""
+        entries = sorted(self.state.values(),
+                         key=lambda entry: (entry.get('date') or '', entry['lastmod'], entry['url']),
+                         reverse=True)[:self.feed_entries]
+        updated = max((entry['lastmod'] for entry in entries), default=_timestamp(datetime(1970, 1, 1)))
+        lines = ['<?xml version="1.0" encoding="utf-8"?>',
+                 '<feed xmlns="http://www.w3.org/2005/Atom">',
+                 f'  <title>{escape(self.feed_title)}</title>',
+                 f'  <link href="{escape(self.base_url)}"/>',
+                 f'  <link rel="self" href="{escape(self.base_url)}feed.xml"/>',
+                 f'  <id>{escape(self.base_url)}</id>',
+                 f'  <updated>{updated}</updated>',
+                 f'  <author><name>{escape(self.feed_author)}</name></author>']
+        for entry in entries:
+            url = escape(self.base_url + entry['url'])
+            lines.append('  <entry>')
+            lines.append(f"    <title>{escape(entry['title'])}</title>")
+            lines.append(f'    <link href="{url}"/>')
+            lines.append(f'    <id>{url}</id>')
+            if entry.get('date'):
+                lines.append(f"    <published>{entry['date']}T00:00:00Z</published>")
+            lines.append(f"    <updated>{entry['lastmod']}</updated>")
+            if entry.get('summary'):
+                lines.append(f"    <summary>{escape(entry['summary'])}</summary>")
+            lines.append('  </entry>')
+        lines.append('</feed>')
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """Write sitemap.xml and feed.xml (untouched when unchanged) and save the state"""
+        self.summary['sitemap'] = write_if_changed(self.output_root / 'sitemap.xml', self.render_sitemap())
+        self.summary['feed'] = write_if_changed(self.output_root / 'feed.xml', self.render_feed())
+        # Only output hashes and lastmod values: identical on every machine for the same output
+        committed = {entry['url']: {'output_hash': entry['output_hash'], 'lastmod': entry['lastmod']}
+                     for entry in self.state.values()}
+        write_if_changed(self.lastmod_file, json.dumps(committed, indent=1, sort_keys=True) + '\n')
+        self._save_state()
+        return self.summary
+
+
+def default_lastmod_file(output_root):
+    """The committed lastmod file, next to the output root like the build manifest"""
+    output_root = Path(output_root)
+    return output_root.parent / f'.{output_root.name}-sitemap-lastmod.json'
+
+
+def open_sitemap_feed(config):
+    """Create the generator described by the `sitemap` config section, or None when disabled"""
+    settings = config.get('sitemap') or {}
+    if not settings.get('enabled', False):
+        return None
+    return SitemapFeed(config['output']['root_dir'], settings['base_url'],
+                       settings.get('state_file', DEFAULT_STATE_FILE),
+                       settings.get('sections', DEFAULT_SECTIONS),
+                       settings.get('feed_title', ''),
+                       int(settings.get('feed_entries', DEFAULT_FEED_ENTRIES)),
+                       settings.get('feed_author', ''),
+                       settings.get('lastmod_file'))
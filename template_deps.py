@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Template dependency tracking for incremental builds
+Extracts include/extends/import edges from the Jinja2 AST so template edits only rebuild affected pages
+"""
+
+import os
+import re
+from pathlib import Path
+from jinja2 import TemplateSyntaxError, meta
+
+from build_manifest import compute_build_key, hash_file
+
+# Marker stored in the graph when a template references a dynamically named template
+DYNAMIC_DEPENDENCY = '*'
+
+# Used only when a template cannot be parsed, so a syntax error never hides a dependency
+REFERENCE_PATTERN = re.compile(r'\{%-?\s*(?:include|extends|import|from)\s+[\'"]([^\'"]+)[\'"]')
+
+
+def find_template_references(env, source):
+    """Find the templates directly referenced by a template source"""
+    try:
+        ast = env.parse(source)
+    except TemplateSyntaxError as e:
+        return sorted(set(REFERENCE_PATTERN.findall(source))), str(e)
+
+    references = set()
+    for name in meta.find_referenced_templates(ast):
+        references.add(DYNAMIC_DEPENDENCY if name is None else name)
+    return sorted(references), None
+
+
+def build_template_graph(env, templates_dir, previous_graph=None, parse=True):
+    """Build the template dependency graph, reusing parsed edges for unchanged templates
+
+    With parse=False only the template hashes are collected.
+    """
+    previous_graph = previous_graph or {}
+    graph = {}
+    root_path = Path(templates_dir)
+
+    if not root_path.exists():
+        return graph
+
+    for template_file in sorted(p for p in root_path.rglob('*') if p.is_file()):
+        name = template_file.relative_to(root_path).as_posix()
+        file_hash = hash_file(template_file)
+
+        if not parse:
+            graph[name] = {'hash': file_hash}
+            continue
+
+        previous = previous_graph.get(name)
+        if previous and previous.get('hash') == file_hash:
+            graph[name] = previous
+            continue
+
+        source = template_file.read_text(encoding='utf-8')
+        references, error = find_template_references(env, source)
+        graph[name] = {'hash': file_hash, 'deps': references}
+        if error:
+            graph[name]['error'] = error
+
+    return graph
+
+
+def resolve_template_closure(graph, template_name):
+    """Return the template and every template it transitively includes, extends or imports"""
+    closure = set()
+    pending = [template_name]
+
+    while pending:
+        name = pending.pop()
+        if name in closure:
+            continue
+        closure.add(name)
+
+        for dep in graph.get(name, {}).get('deps', []):
+            if dep == DYNAMIC_DEPENDENCY:
+                # Unknown target: conservatively depend on every template
+                closure.update(graph.keys())
+            else:
+                pending.append(dep)
+
+    return closure
+
+
+def resolve_css_paths(css_files, output_file):
+    """Resolve css_files (relative to the output HTML) to paths on disk"""
+    output_dir = Path(output_file).parent
+    return [Path(os.path.normpath(output_dir / css_file)) for css_file in css_files]
+
+
+def hash_dependencies(graph, template_names, file_paths, file_hashes=None):
+    """Hash the exact set of template and file (CSS, image) inputs a page depends on"""
+    file_hashes = {} if file_hashes is None else file_hashes
+    parts = []
+
+    for name in sorted(template_names):
+        parts.append(f"{name}={graph.get(name, {}).get('hash', 'missing')}")
+
+    for file_path in sorted(file_paths):
+        key = file_path.as_posix()
+        if key not in file_hashes:
+            file_hashes[key] = hash_file(file_path) if file_path.exists() else 'missing'
+        parts.append(f"{key}={file_hashes[key]}")
+
+    return compute_build_key(*parts)
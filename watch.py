@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+File watching and live reload for the converters
+inotify-driven change detection (polling fallback), event debouncing and a tiny
+live-reload HTTP server that tells open browser tabs to refresh after a rebuild
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+LIVERELOAD_PATH = '/__livereload'
+LIVERELOAD_SCRIPT = (
+    '<script>new EventSource("/__livereload").onmessage = function () '
+    '{ location.reload(); };</script>'
+)
+
+
+def is_editor_artifact(path):
+    """Ignore swap, backup and temporary files written by editors"""
+    name = Path(path).name
+    return name.startswith('.') or name.endswith(('~', '.swp', '.swx', '.tmp'))
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher (Linux) built on libc through ctypes"""
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        for root, recursive in roots:
+            self._add_tree(Path(root), recursive)
+
+    def _add_watch(self, directory, recursive):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = (Path(directory), recursive)
+
+    def _add_tree(self, root, recursive):
+        if not root.is_dir():
+            return
+        self._add_watch(root, recursive)
+        if recursive:
+            for directory in root.rglob('*'):
+                if directory.is_dir():
+                    self._add_watch(directory, True)
+
+    def read(self, timeout):
+        """Wait up to timeout seconds (None = forever) and return the changed paths"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; report every watched directory as changed
+                changed.update(directory for directory, _ in self._dirs.values())
+                continue
+
+            directory, recursive = self._dirs.get(wd, (None, False))
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path, True)
+                continue
+            if not is_editor_artifact(path):
+                changed.add(path)
+
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Portable fallback that compares mtime/size snapshots of the watched trees"""
+
+    def __init__(self, roots, interval=0.1):
+        self._roots = [(Path(root), recursive) for root, recursive in roots]
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root, recursive in self._roots:
+            if not root.is_dir():
+                continue
+            for path in (root.rglob('*') if recursive else root.iterdir()):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path.is_file() and not is_editor_artifact(path):
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout):
+        """Poll until something changes or the timeout expires"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(path) != self._snapshot.get(path)}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self._interval)
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots):
+    """Use inotify where available, otherwise fall back to polling"""
+    try:
+        return InotifyWatcher(roots)
+    except (OSError, AttributeError):
+        return PollingWatcher(roots)
+
+
+def watch(roots, on_change, debounce=0.03):
+    """Call on_change(paths) once per burst of events, after debounce seconds of quiet"""
+    watcher = create_watcher(roots)
+    print(f"Watching {', '.join(str(root) for root, _ in roots)} ({type(watcher).__name__})")
+    pending = set()
+    try:
+        while True:
+            events = watcher.read(debounce if pending else None)
+            if events:
+                pending.update(events)
+            elif pending:
+                on_change(pending)
+                pending = set()
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """Serves the output directory, injecting the reload script into HTML pages"""
+
+    server_version = 'LiveReload/1.0'
+
+    def do_GET(self):
+        if self.path == LIVERELOAD_PATH:
+            return self._stream_reload_events()
+
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            path = path / 'index.html'
+        if path.suffix == '.html' and path.is_file():
+            body = path.read_bytes().replace(b'</body>', LIVERELOAD_SCRIPT.encode('utf-8') + b'</body>', 1)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+            return None
+
+        return super().do_GET()
+
+    def _stream_reload_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+
+        reloader = self.server.reloader
+        version = reloader.version
+        try:
+            while True:
+                version = reloader.wait_for_change(version, timeout=15)
+                # A comment line doubles as a keep-alive when nothing changed
+                message = b'data: reload\n\n' if version is not None else b': ping\n\n'
+                self.wfile.write(message)
+                self.wfile.flush()
+                if version is None:
+                    version = reloader.version
+        except (BrokenPipeError, ConnectionResetError):
+            return None
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LiveReloadServer:
+    """Tiny local HTTP server that pushes reloads to open browser tabs (Server-Sent Events)"""
+
+    def __init__(self, root_dir, port=8000, host='127.0.0.1'):
+        self.version = 0
+        self._condition = threading.Condition()
+        handler = partial(LiveReloadHandler, directory=str(root_dir))
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._httpd.reloader = self
+        self.url = f'http://{host}:{self._httpd.server_address[1]}/'
+
+    def start(self):
+        thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        thread.start()
+        print(f"Serving {self.url} with live reload")
+
+    def notify(self):
+        """Tell every connected tab to reload"""
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        """Block until the version moves past version; returns the new version or None on timeout"""
+        with self._condition:
+            if self._condition.wait_for(lambda: self.version != version, timeout=timeout):
+                return self.version
+            return None
+
+    def stop(self):
+        self._httpd.shutdown()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Shared YAML layer for frontmatter and configuration parsing
+Uses the libyaml-backed CSafeLoader when PyYAML was built with it (falling back to the
+pure-Python SafeLoader), and memoizes parsed config files by mtime and content hash
+"""
+
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from build_manifest import hash_bytes
+
+# Same constructors and resolver as yaml.SafeLoader, so results are identical
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAMLError = yaml.YAMLError
+
+CONFIG_CACHE_DIR = '.cache/config'
+
+# Resolved config path -> (mtime_ns, size, content hash, pickled config)
+_config_memo = {}
+
+
+def safe_load(stream):
+    """yaml.safe_load() using the fastest available loader"""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def using_libyaml():
+    """True when the C loader is in use"""
+    return SafeLoader is not yaml.SafeLoader
+
+
+def _config_cache_path(config_path, cache_dir):
+    return Path(cache_dir) / f'{hash_bytes(os.fsencode(config_path))[:16]}.pickle'
+
+
+def _read_config_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    if not (isinstance(entry, tuple) and len(entry) == 4 and isinstance(entry[3], bytes)):
+        return None
+    return entry
+
+
+def _write_config_cache(cache_path, entry):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, cache_path)
+    except OSError:
+        # The cache is an optimization; a failed write must never fail the build
+        try:
+            os.unlink(tmp_name)
+        except (OSError, UnboundLocalError):
+            pass
+
+
+def load_yaml_config(config_file, cache_dir=CONFIG_CACHE_DIR):
+    """Load a YAML config file, reusing the parsed result while the file is unchanged
+
+    An unchanged mtime and size skips reading the file entirely; a touched but
+    identical file is recognised by its content hash. Results are kept in memory
+    and pickled under cache_dir so separate invocations share them. Callers get
+    a private copy they are free to modify.
+    """
+    config_path = Path(config_file).resolve()
+    stat = config_path.stat()
+
+    entry = _config_memo.get(config_path)
+    cache_path = _config_cache_path(config_path, cache_dir) if cache_dir else None
+    if entry is None and cache_path is not None:
+        entry = _read_config_cache(cache_path)
+
+    if entry is None or (entry[0], entry[1]) != (stat.st_mtime_ns, stat.st_size):
+        data = config_path.read_bytes()
+        content_hash = hash_bytes(data)
+        if entry is not None and entry[2] == content_hash:
+            pickled = entry[3]
+        else:
+            pickled = pickle.dumps(safe_load(data), protocol=pickle.HIGHEST_PROTOCOL)
+        entry = (stat.st_mtime_ns, stat.st_size, content_hash, pickled)
+        if cache_path is not None:
+            _write_config_cache(cache_path, entry)
+
+    _config_memo[config_path] = entry
+    # Unpickling is both the private copy and much cheaper than deepcopy
+    return pickle.loads(entry[3])